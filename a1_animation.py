@@ -0,0 +1,68 @@
+"""
+Sprite IDs for the A1 character animations.
+
+Every sprite a character can show, one frame of one animation of one class,
+has a small integer ID, worked out once when this module is imported. The
+frames of an animation have consecutive IDs, so a character moves on to its
+next frame with integer arithmetic (precomputed in NEXT_SPRITE) instead of
+building a sprite name, and the UI can keep sprite surfaces in a list indexed
+by ID.
+
+SPRITE_NAMES and SPRITE_IDS convert between IDs and the sprite names (file
+names in sprites/, without .png) that the rest of the game used before IDs.
+"""
+from typing import Dict, Tuple
+
+# The character classes, animations and frames per animation with sprites.
+CLASS_NAMES = ('rogue', 'mage')
+ANIMATIONS = ('idle', 'attack', 'special')
+FRAMES = 10
+
+# The number of sprites each class has.
+_CLASS_SPRITES = len(ANIMATIONS) * FRAMES
+
+# SPRITE_NAMES[sprite] is the name of the sprite with ID sprite.
+SPRITE_NAMES: Tuple[str, ...] = tuple(
+    '{}_{}_{}'.format(class_name, animation, frame)
+    for class_name in CLASS_NAMES
+    for animation in ANIMATIONS
+    for frame in range(FRAMES))
+SPRITE_IDS: Dict[str, int] = {name: sprite
+                              for sprite, name in enumerate(SPRITE_NAMES)}
+
+
+def sprite_id(class_name: str, animation: str, frame: int = 0) -> int:
+    """
+    Return the ID of frame number frame of animation for class_name.
+
+    >>> SPRITE_NAMES[sprite_id('mage', 'attack', 3)]
+    'mage_attack_3'
+    """
+    return (CLASS_NAMES.index(class_name) * _CLASS_SPRITES +
+            ANIMATIONS.index(animation) * FRAMES + frame)
+
+
+def _next_sprite(sprite: int) -> int:
+    """
+    Return the ID of the sprite shown after the sprite with ID sprite: the
+    next frame of the same animation, or the first idle frame once the
+    animation has finished.
+
+    >>> SPRITE_NAMES[_next_sprite(sprite_id('rogue', 'special', 4))]
+    'rogue_special_5'
+    >>> SPRITE_NAMES[_next_sprite(sprite_id('mage', 'special', 9))]
+    'mage_idle_0'
+    """
+    if (sprite + 1) % FRAMES:
+        return sprite + 1
+    return sprite - sprite % _CLASS_SPRITES
+
+
+# NEXT_SPRITE[sprite] is the ID of the sprite shown after sprite.
+NEXT_SPRITE: Tuple[int, ...] = tuple(_next_sprite(sprite)
+                                     for sprite in range(len(SPRITE_NAMES)))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
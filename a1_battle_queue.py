@@ -19,7 +19,15 @@ the constructors for the docstring examples.
 
 # from a1_playstyle import ManualPlaystyle, RandomPlaystyle
 # from a1_character_class import Rogue, Mage
-from typing import Union
+from collections import deque
+from heapq import merge
+from typing import Any, Callable, Iterator, List, Union
+
+# The events a BattleQueue sends its observers. TURN_CHANGED comes with the
+# character whose turn it is now (None once the game is over), GAME_OVER
+# with the winner (None for a tie).
+TURN_CHANGED = 'turn'
+GAME_OVER = 'game_over'
 
 
 class BattleQueue:
@@ -28,7 +36,23 @@ class BattleQueue:
     """
 
     # Dont need to document private attributes b/c the user shouldnt see these.
-    # _queue_content: list
+    # _queue_content: deque of (number, character) entries, front first. The
+    #   number counts up with every add and keeps the entries in order.
+    # _parked: entries taken off the front of _queue_content because their
+    #   character had no actions (so they would be skipped anyway), in order.
+    # _counts: dict of character -> entries it has in the queue
+    # _exhausted: set of characters known to have no actions
+    # _added: int, the number of entries ever added
+    # _stale: set of characters whose SP may have changed since the last sync
+    # _over: the cached result of is_over(), or None if it needs recomputing
+    # _winner: the cached result of get_winner()
+    # _observers: list of callables told about turn and game over changes
+    # _turn: the character whose turn observers were last told it is
+    # _told_over: whether observers were last told the game is over
+
+    # Set to True (on the class or one queue) to check every recomputation of
+    # the cached game state against a full scan of the queue.
+    debug = False
 
     def __init__(self) -> None:
         """
@@ -38,9 +62,148 @@ class BattleQueue:
         >>> bq.is_empty()
         True
         """
-        self._queue_content = []
+        self._queue_content = deque()
+        self._parked = deque()
+        self._counts = {}
+        self._exhausted = set()
+        self._added = 0
+        self._stale = set()
+        self._over = None
+        self._winner = None
+        self._observers = []
+        self._turn = None
+        self._told_over = False
         # self.playstyle = Playstyle(self)
 
+    def add_observer(self, observer: Callable[['BattleQueue', str, Any],
+                                              None]) -> None:
+        """
+        Call observer(self, event, value) every time whose turn it is
+        changes (event TURN_CHANGED) or the game ends (event GAME_OVER), as
+        described at the top of this module.
+
+        >>> bq = BattleQueue()
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> from a1_character_class import Rogue
+        >>> c = Rogue("Sophia", bq, ManualPlaystyle(bq))
+        >>> c2 = Rogue("Player 2", bq, ManualPlaystyle(bq))
+        >>> c.enemy = c2
+        >>> c2.enemy = c
+        >>> bq.add_observer(lambda bq, event, value: print(event, repr(value)))
+        >>> bq.add(c)
+        turn Sophia (Rogue): 100/100
+        >>> bq.add(c2)
+        >>> bq.remove()
+        turn Player 2 (Rogue): 100/100
+        Sophia (Rogue): 100/100
+        >>> c.health_points = 0
+        turn None
+        game_over Player 2 (Rogue): 100/100
+        """
+        if not self._observers:
+            self._told_over = self.is_over()
+            self._turn = None if self._told_over else self.peek()
+        self._observers.append(observer)
+
+    def remove_observer(self, observer: Callable[['BattleQueue', str, Any],
+                                                 None]) -> None:
+        """
+        Stop calling observer, which was added with add_observer.
+        """
+        self._observers.remove(observer)
+
+    def _notify_observers(self) -> None:
+        """
+        Tell the observers whose turn it is and whether the game is over, if
+        either has changed since they were last told.
+        """
+        over = self.is_over()
+        turn = None if over else self.peek()
+        if turn is not self._turn:
+            self._turn = turn
+            for observer in self._observers:
+                observer(self, TURN_CHANGED, turn)
+        if over != self._told_over:
+            self._told_over = over
+            if over:
+                for observer in self._observers:
+                    observer(self, GAME_OVER, self._winner)
+
+    def notify_changed(self, character: 'Character') -> None:
+        """
+        Tell this BattleQueue that character's HP, SP or enemy has changed.
+        Characters call this themselves whenever one of those is set.
+
+        >>> bq = BattleQueue()
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> from a1_character_class import Rogue
+        >>> c = Rogue("Sophia", bq, ManualPlaystyle(bq))
+        >>> c2 = Rogue("Player 2", bq, ManualPlaystyle(bq))
+        >>> c.enemy = c2
+        >>> c2.enemy = c
+        >>> bq.add(c)
+        >>> bq.add(c2)
+        >>> bq.is_over()
+        False
+        >>> c.skill_points = 0
+        >>> c2.skill_points = 0
+        >>> bq.is_over()
+        True
+        """
+        self._stale.add(character)
+        self._over = None
+        if self._observers:
+            self._notify_observers()
+
+    def _sync(self) -> None:
+        """
+        Bring the set of characters with no actions up to date, and move the
+        entries of those characters off the front of the queue so that the
+        front entry (if any) belongs to a character that can act.
+
+        Characters normally never get actions back once they run out, but if
+        one does (e.g. its SP is set directly), its parked entries are put
+        back in their original places.
+        """
+        revived = False
+        for char in self._stale:
+            if char not in self._counts:
+                continue
+            if not char.available_actions:
+                self._exhausted.add(char)
+            elif char in self._exhausted:
+                self._exhausted.discard(char)
+                revived = True
+        self._stale.clear()
+        if revived:
+            self._queue_content = deque(merge(self._parked,
+                                              self._queue_content))
+            self._parked.clear()
+
+        while (self._queue_content and
+               self._queue_content[0][1] in self._exhausted):
+            self._parked.append(self._queue_content.popleft())
+
+    def _push(self, character: 'Character') -> None:
+        """
+        Add an entry for character to the back of the queue.
+        """
+        self._queue_content.append((self._added, character))
+
+    def _pop_front(self) -> 'Character':
+        """
+        Take the front entry off the queue and return its character.
+        """
+        return self._queue_content.popleft()[1]
+
+    def _chars_in_order(self) -> Iterator['Character']:
+        """
+        Yield the character of every entry in the queue (including parked
+        ones), front to back.
+        """
+        for entry in merge(self._parked, self._queue_content):
+            yield entry[1]
+
     def add(self, character: 'Character') -> None:
         """
         Add character to this BattleQueue.
@@ -60,7 +223,15 @@ class BattleQueue:
         >>> bq.is_over()
         False
         """
-        self._queue_content.append(character)
+        self._push(character)
+        self._added += 1
+        if character not in self._counts:
+            self._counts[character] = 0
+            self._stale.add(character)
+        self._counts[character] += 1
+        self._over = None
+        if self._observers:
+            self._notify_observers()
 
     def remove(self) -> Union["Character", None]:
         """
@@ -83,16 +254,19 @@ class BattleQueue:
         >>> bq.remove()
         Player 2 (Rogue): 100/100
         """
-        temp_lst = []
-
-        for char in self._queue_content:
-            if char.get_available_actions() != []:
-                temp_lst.append(char)
-
-        if len(temp_lst) >= 1:
-            self._queue_content.remove(temp_lst[0])
-            return temp_lst[0]
-        return None
+        self._sync()
+        if not self._queue_content:
+            return None
+
+        char = self._pop_front()
+        self._counts[char] -= 1
+        if self._counts[char] == 0:
+            del self._counts[char]
+            self._exhausted.discard(char)
+        self._over = None
+        if self._observers:
+            self._notify_observers()
+        return char
 
     def is_empty(self) -> bool:
         """
@@ -116,14 +290,8 @@ class BattleQueue:
         >>> bq.is_empty()
         False
         """
-        count = 0
-
-        if self._queue_content == []:
-            return True
-        for char in self._queue_content:
-            if char.get_available_actions() == []:
-                count += 1
-        return count == len(self._queue_content)
+        self._sync()
+        return not self._queue_content
 
     def peek(self) -> Union["Character", None]:
         """
@@ -147,19 +315,30 @@ class BattleQueue:
         >>> bq.is_empty()
         False
         """
-        to_return = None
-        # moves = 0
-        temp_lst = []
-
-        if self._queue_content != []:
-            for char in self._queue_content:
-                if char.get_available_actions() != []:
-                    temp_lst.append(char)
+        self._sync()
+        if self._queue_content:
+            return self._queue_content[0][1]
+        return None
 
-        if temp_lst != []:
-            to_return = temp_lst[0]
+    def get_order(self) -> List['Character']:
+        """
+        Return the character of every entry in this BattleQueue, front to
+        back, including those who can't perform actions any more.
 
-        return to_return
+        >>> bq = BattleQueue()
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> from a1_character_class import Mage, Rogue
+        >>> c = Rogue("Sophia", bq, ManualPlaystyle(bq))
+        >>> c1 = Mage("Ann", bq, ManualPlaystyle(bq))
+        >>> c.enemy = c1
+        >>> c1.enemy = c
+        >>> bq.add(c)
+        >>> bq.add(c1)
+        >>> c.special_attack()
+        >>> [char.get_name() for char in bq.get_order()]
+        ['Sophia', 'Ann', 'Sophia', 'Sophia']
+        """
+        return list(self._chars_in_order())
 
     def is_over(self) -> bool:
         """
@@ -188,23 +367,12 @@ class BattleQueue:
         >>> bq.is_over()
         False
         """
-        no_hp = False
-
-        if self.is_empty():
-            # is_empty_q = True
-            return True
-
-        if (self.peek().get_hp() == 0 or
-                self.peek().enemy.get_hp() == 0):
-            return True
-
-        # is the following repetetive??
-
-        if (self.peek().get_available_actions() == [] and
-                self.peek().enemy.get_available_actions() == []):
-            return True
-
-        return no_hp
+        if self._over is None:
+            self._over = self._compute_is_over()
+            self._winner = self._compute_winner() if self._over else None
+            if self.debug:
+                self._check_state()
+        return self._over
 
     def get_winner(self) -> Union["Character", None]:
         """
@@ -239,17 +407,8 @@ class BattleQueue:
         >>> bq.get_winner()
         """
 
-        to_return = None
-
-        if self.is_over():
-            for char in self._queue_content:
-                if char.get_hp() > 0 and char.enemy.get_hp() == 0:
-                    to_return = char
-                    return to_return
-                elif char.get_hp == 0 and char.enemy.get_hp() > 0:
-                    to_return = char.enemy
-                    return to_return
-        return to_return
+        self.is_over()
+        return self._winner
 
         # to_return = None
         #
@@ -266,6 +425,119 @@ class BattleQueue:
         #
         # return to_return
 
+    def _compute_is_over(self) -> bool:
+        """
+        Work out whether the game is over, as described in is_over.
+        """
+        front = self.peek()
+        if front is None:
+            return True
+        if front.get_hp() == 0 or front.enemy.get_hp() == 0:
+            return True
+        return not (front.available_actions or
+                    front.enemy.available_actions)
+
+    def _compute_winner(self) -> Union["Character", None]:
+        """
+        Work out the winner of a game that is over, as described in
+        get_winner.
+        """
+        for char in self._chars_in_order():
+            if char.get_hp() > 0 and char.enemy.get_hp() == 0:
+                return char
+        return None
+
+    def _check_state(self) -> None:
+        """
+        Check the cached game state against a full scan of every entry in
+        this BattleQueue, and raise AssertionError if they disagree.
+        """
+        chars = list(self._chars_in_order())
+        can_act = [char for char in chars
+                   if char.get_available_actions() != []]
+        if can_act == []:
+            over = True
+        else:
+            front = can_act[0]
+            over = (front.get_hp() == 0 or front.enemy.get_hp() == 0 or
+                    (front.get_available_actions() == [] and
+                     front.enemy.get_available_actions() == []))
+
+        winner = None
+        if over:
+            for char in chars:
+                if char.get_hp() > 0 and char.enemy.get_hp() == 0:
+                    winner = char
+                    break
+
+        if (over, winner) != (self._over, self._winner):
+            raise AssertionError(
+                "Cached game state (over: {}, winner: {!r}) doesn't match the "
+                "queue (over: {}, winner: {!r})".format(
+                    self._over, self._winner, over, winner))
+
+
+class RunLengthBattleQueue(BattleQueue):
+    """
+    A BattleQueue that stores consecutive entries for the same character as
+    a single run, so a character that is added several times in a row (e.g.
+    by a Rogue's special attack) takes up one entry instead of several.
+    It behaves exactly like a BattleQueue.
+
+    >>> bq = RunLengthBattleQueue()
+    >>> from a1_playstyle import ManualPlaystyle
+    >>> ps = ManualPlaystyle(bq)
+    >>> from a1_character_class import Rogue
+    >>> c = Rogue("Sophia", bq, ps)
+    >>> c2 = Rogue("Player 2", bq, ps)
+    >>> c.enemy = c2
+    >>> c2.enemy = c
+    >>> for char in [c, c, c, c2, c]:
+    ...     bq.add(char)
+    >>> len(bq._queue_content)
+    3
+    >>> [bq.remove().get_name() for _ in range(5)]
+    ['Sophia', 'Sophia', 'Sophia', 'Player 2', 'Sophia']
+    >>> bq.is_empty()
+    True
+    """
+
+    # _queue_content and _parked hold [number, character, count] runs, where
+    # the run covers the count entries numbered from number onwards.
+
+    def _push(self, character: 'Character') -> None:
+        """
+        Add an entry for character to the back of the queue, extending the
+        last run if it is character's.
+        """
+        if self._queue_content:
+            last = self._queue_content[-1]
+            if last[1] is character and last[0] + last[2] == self._added:
+                last[2] += 1
+                return
+        self._queue_content.append([self._added, character, 1])
+
+    def _pop_front(self) -> 'Character':
+        """
+        Take the front entry off the queue and return its character.
+        """
+        run = self._queue_content[0]
+        if run[2] == 1:
+            self._queue_content.popleft()
+        else:
+            run[0] += 1
+            run[2] -= 1
+        return run[1]
+
+    def _chars_in_order(self) -> Iterator['Character']:
+        """
+        Yield the character of every entry in the queue (including parked
+        ones), front to back.
+        """
+        for run in merge(self._parked, self._queue_content):
+            for _ in range(run[2]):
+                yield run[1]
+
 
 if __name__ == '__main__':
     import python_ta
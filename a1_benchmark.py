@@ -0,0 +1,414 @@
+"""
+A benchmark suite for A1.
+
+Each benchmark times one operation of the game, the way timeit does: it runs
+the operation enough times to take a measurable while, repeats that, and
+keeps the fastest run. Random numbers are seeded before every benchmark, so
+runs do the same work each time.
+
+Results are written as JSON, and can be compared with a saved baseline to
+flag any benchmark that got slower by more than a threshold.
+
+Separately, --sessions N measures what hosting N live a1_game.GameSessions
+at once costs: the memory each one takes and the time a turn takes when turns
+go round all of them.
+
+--startup measures how long a fresh interpreter takes to import a1_game and
+a1_ui and to draw the UI's first frame (on a headless display), and checks
+that the game logic modules don't import pygame.
+
+Run it from the command line, e.g.:
+    python a1_benchmark.py --output before.json
+    python a1_benchmark.py --baseline before.json --threshold 0.1
+    python a1_benchmark.py --sessions 100000
+    python a1_benchmark.py --startup
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import a1_game
+from a1_battle_queue import BattleQueue
+from a1_game import GameSession
+from a1_simulate import set_up_battle
+
+# The battle queue lengths the BattleQueue benchmarks run at.
+QUEUE_LENGTHS = (2, 64, 1024)
+DEFAULT_REPEAT = 5
+# A benchmark is a regression if it got more than this much slower.
+DEFAULT_THRESHOLD = 0.1
+
+# The modules that must be importable without pygame.
+LOGIC_MODULES = ('a1_game', 'a1_battle_queue', 'a1_character_class',
+                 'a1_playstyle')
+# What --startup times, each in a fresh interpreter.
+STARTUP_SCRIPTS = {
+    'python': "pass",
+    'import a1_game': "import a1_game",
+    'import a1_ui': "import a1_ui",
+    'first frame': "import a1_game, a1_ui\n"
+                   "from a1_simulate import set_up_battle\n"
+                   "a1_game.BATTLE_QUEUE, a1_game.P1, a1_game.P2 = "
+                   "set_up_battle('r', 'm')\n"
+                   "a1_ui.create_window()\n"
+                   "a1_ui.update_game()\n"}
+
+# A benchmark sets up its state and returns the operation to time.
+Benchmark = Callable[[], Callable[[], object]]
+
+
+def _queue_of(length: int) -> Tuple[BattleQueue, 'Character']:
+    """
+    Return a battle queue of length entries alternating between two Rogues,
+    and the Rogue at its front.
+    """
+    battle_queue, p1, p2 = set_up_battle('r', 'r', 'm', 'm')
+    for i in range(length - 2):
+        battle_queue.add((p1, p2)[i % 2])
+    return battle_queue, p1
+
+
+def _queue_benchmarks() -> Dict[str, Benchmark]:
+    """
+    Return the BattleQueue benchmarks at every length in QUEUE_LENGTHS.
+    """
+    benchmarks = {}
+    for length in QUEUE_LENGTHS:
+        def add_remove(length: int = length) -> Callable[[], object]:
+            battle_queue, p1 = _queue_of(length)
+
+            def operation() -> None:
+                battle_queue.add(p1)
+                battle_queue.remove()
+            return operation
+
+        def query(method: str, length: int = length
+                  ) -> Callable[[], Callable[[], object]]:
+            return lambda: getattr(_queue_of(length)[0], method)
+
+        benchmarks['battle_queue.add+remove[{}]'.format(length)] = add_remove
+        for method in ('peek', 'is_empty', 'is_over', 'get_winner'):
+            benchmarks['battle_queue.{}[{}]'.format(method, length)] = \
+                query(method)
+    return benchmarks
+
+
+def _character_benchmarks() -> Dict[str, Benchmark]:
+    """
+    Return the Character benchmarks for every class.
+    """
+    benchmarks = {}
+    for key, name in (('r', 'rogue'), ('m', 'mage')):
+        def character(key: str = key) -> 'Character':
+            return set_up_battle(key, key)[1]
+        benchmarks[name + '.get_available_actions'] = \
+            lambda character=character: character().get_available_actions
+        benchmarks[name + '.get_next_sprite'] = \
+            lambda character=character: character().get_next_sprite
+        benchmarks[name + '.get_next_sprite_id'] = \
+            lambda character=character: character().get_next_sprite_id
+    return benchmarks
+
+
+def _start_game() -> None:
+    """
+    Set up a1_game's globals for a new Rogue against Mage battle between
+    random playstyles.
+    """
+    a1_game.BATTLE_QUEUE, a1_game.P1, a1_game.P2 = set_up_battle('r', 'm')
+    a1_game.GAME_IS_OVER = False
+    a1_game.GAME_WINNER = None
+
+
+def _perform_attack() -> Callable[[], object]:
+    """
+    Return one turn of a1_game.perform_attack, starting a new battle first
+    whenever the last one is over.
+    """
+    _start_game()
+
+    def operation() -> None:
+        if a1_game.GAME_IS_OVER:
+            _start_game()
+        a1_game.perform_attack()
+    return operation
+
+
+def _update_ui() -> Callable[[], object]:
+    """
+    Return a1_game.update_ui on a new battle.
+    """
+    _start_game()
+    return a1_game.update_ui
+
+
+def _session_perform_attack() -> Callable[[], object]:
+    """
+    Return one turn of GameSession.perform_attack, starting a new session
+    first whenever the last one is over.
+    """
+    sessions = [GameSession.new('r', 'm')]
+
+    def operation() -> None:
+        if sessions[0].game_is_over:
+            sessions[0] = GameSession.new('r', 'm')
+        sessions[0].perform_attack()
+    return operation
+
+
+def _session_update_ui(method: str) -> Callable[[], Callable[[], object]]:
+    """
+    Return a benchmark of a GameSession's update_ui or update_ui_diff (named
+    method) when a turn is played every RANDOM_TIMER frames, as in a1_ui.
+    """
+    def benchmark() -> Callable[[], object]:
+        sessions = [GameSession.new('r', 'm')]
+        frames = [0]
+
+        def operation() -> None:
+            session = sessions[0]
+            frames[0] += 1
+            if frames[0] % 10 == 0:
+                if session.game_is_over:
+                    session = sessions[0] = GameSession.new('r', 'm')
+                session.perform_attack()
+            getattr(session, method)()
+        return operation
+    return benchmark
+
+
+def _update_game() -> Callable[[], object]:
+    """
+    Return a1_ui.update_game drawing to a headless display.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import a1_ui
+    _start_game()
+    a1_ui.create_window()
+    return a1_ui.update_game
+
+
+def _ui_frame() -> Callable[[], object]:
+    """
+    Return one frame of a1_ui's main loop, drawing to a headless display:
+    a tick of the game's logic (a turn every RANDOM_TIMER ticks) and drawing
+    what it changed, starting a new battle first whenever the last one is
+    over.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import a1_ui
+    _start_game()
+    a1_ui.create_window()
+    ticks = [0]
+
+    def operation() -> None:
+        if a1_game.GAME_IS_OVER:
+            _start_game()
+        ticks[0] += 1
+        a1_ui.draw_game(a1_ui.tick_game(ticks[0]))
+    return operation
+
+
+def benchmarks() -> Dict[str, Benchmark]:
+    """
+    Return every benchmark in the suite by name.
+
+    >>> 'battle_queue.peek[64]' in benchmarks()
+    True
+    """
+    suite = _queue_benchmarks()
+    suite.update(_character_benchmarks())
+    suite['game.perform_attack'] = _perform_attack
+    suite['game.update_ui'] = _update_ui
+    suite['game_session.perform_attack'] = _session_perform_attack
+    suite['game_session.update_ui'] = _session_update_ui('update_ui')
+    suite['game_session.update_ui_diff'] = _session_update_ui(
+        'update_ui_diff')
+    suite['ui.update_game'] = _update_game
+    suite['ui.frame'] = _ui_frame
+    return suite
+
+
+def run(names: Optional[List[str]] = None, repeat: int = DEFAULT_REPEAT
+        ) -> Dict[str, float]:
+    """
+    Run the benchmarks named in names (all of them if names is None) and
+    return the nanoseconds per operation of each.
+
+    A benchmark that can't run here (e.g. ui.update_game without pygame) is
+    left out.
+
+    >>> results = run(['battle_queue.is_empty[2]'], repeat=1)
+    >>> results['battle_queue.is_empty[2]'] > 0
+    True
+    """
+    suite = benchmarks()
+    results = {}
+    for name in names if names is not None else suite:
+        random.seed(0)
+        try:
+            operation = suite[name]()
+        except ImportError:
+            continue
+        timer = timeit.Timer(operation)
+        number = timer.autorange()[0]
+        best = min(timer.repeat(repeat, number))
+        results[name] = best / number * 1e9
+    return results
+
+
+def session_overhead(count: int) -> Dict[str, float]:
+    """
+    Start count Rogue against Mage GameSessions between random playstyles
+    and play turns round-robin across all of them, starting a session again
+    whenever its game is over. Return the bytes allocated per session and
+    the nanoseconds per turn.
+
+    >>> overhead = session_overhead(10)
+    >>> overhead['sessions'], overhead['bytes_per_session'] > 0
+    (10, True)
+    """
+    random.seed(0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [GameSession.new('r', 'm') for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(DEFAULT_REPEAT):
+        for i, session in enumerate(sessions):
+            if session.game_is_over:
+                session = sessions[i] = GameSession.new('r', 'm')
+            session.perform_attack()
+        turns += count
+    elapsed = time.perf_counter() - start
+    return {'sessions': count, 'bytes_per_session': (after - before) / count,
+            'ns_per_turn': elapsed / turns * 1e9}
+
+
+def _run_python(script: str) -> str:
+    """
+    Run script in a fresh interpreter with a headless display and return
+    what it printed.
+    """
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy')
+    return subprocess.run([sys.executable, '-c', script], env=env,
+                          check=True, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL,
+                          universal_newlines=True).stdout
+
+
+def imports_pygame(module: str) -> bool:
+    """
+    Return whether importing module in a fresh interpreter imports pygame.
+
+    >>> any(imports_pygame(module) for module in LOGIC_MODULES)
+    False
+    """
+    return _run_python("import sys, {}\nprint('pygame' in sys.modules)"
+                       .format(module)).strip() == 'True'
+
+
+def startup_times(repeat: int = DEFAULT_REPEAT) -> Dict[str, float]:
+    """
+    Return the fastest of repeat wall-clock times, in milliseconds, that a
+    fresh interpreter takes to run each of STARTUP_SCRIPTS.
+    """
+    times = {}
+    for name, script in STARTUP_SCRIPTS.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _run_python(script)
+            best = min(best, time.perf_counter() - start)
+        times[name] = best * 1000
+    return times
+
+
+def compare(baseline: Dict[str, float], results: Dict[str, float],
+            threshold: float = DEFAULT_THRESHOLD
+            ) -> List[Tuple[str, float, float]]:
+    """
+    Return (name, baseline ns, new ns) for every benchmark in both baseline
+    and results that got more than threshold slower.
+
+    >>> compare({'a': 100.0, 'b': 100.0}, {'a': 105.0, 'b': 120.0})
+    [('b', 100.0, 120.0)]
+    """
+    return [(name, baseline[name], results[name]) for name in results
+            if name in baseline and
+            results[name] > baseline[name] * (1 + threshold)]
+
+
+def main() -> None:
+    """
+    Run the suite from the command line, save the results and compare them
+    with a baseline.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help="benchmarks to run (default: all)")
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', default=None,
+                        help="a saved run to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--sessions', type=int, default=None,
+                        help="measure the overhead of this many live "
+                             "sessions instead")
+    parser.add_argument('--startup', action='store_true',
+                        help="measure startup times instead")
+    args = parser.parse_args()
+
+    if args.startup:
+        for name, ms in startup_times(args.repeat).items():
+            print("{:<36} {:>9,.1f} ms".format(name, ms))
+        for module in LOGIC_MODULES:
+            if imports_pygame(module):
+                print("{} imports pygame".format(module))
+        return
+
+    if args.sessions is not None:
+        overhead = session_overhead(args.sessions)
+        print("{sessions:,} sessions: {bytes_per_session:,.0f} bytes each, "
+              "{ns_per_turn:,.1f} ns per turn".format(**overhead))
+        return
+
+    results = run(args.names or None, args.repeat)
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+
+    for name, ns in results.items():
+        change = ''
+        if baseline is not None and name in baseline:
+            change = '{:+.1%}'.format(ns / baseline[name] - 1)
+        print("{:<36} {:>12,.1f} ns {:>8}".format(name, ns, change))
+
+    with open(args.output, 'w') as file:
+        json.dump({'python': sys.version.split()[0],
+                   'machine': platform.machine(),
+                   'results': results}, file, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for name, before, after in regressions:
+            print("REGRESSION {}: {:,.1f} ns -> {:,.1f} ns".format(
+                name, before, after))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,24 @@
 """
 Create the Character class for Mage or Rouge.
 """
-from typing import Any
+from typing import Any, Callable
+from a1_animation import (FRAMES, NEXT_SPRITE, SPRITE_IDS, SPRITE_NAMES,
+                          sprite_id)
 # from a1_battle_queue import BattleQueue
 # from a1_playstyle import RandomPlaystyle, ManualPlaystyle
 
+# The events a Character sends its observers, with the new value.
+HP_CHANGED = 'hp'
+SP_CHANGED = 'sp'
+
+# The first frame of each animation (see a1_animation).
+_ROGUE_IDLE = sprite_id('rogue', 'idle')
+_ROGUE_ATTACK = sprite_id('rogue', 'attack')
+_ROGUE_SPECIAL = sprite_id('rogue', 'special')
+_MAGE_IDLE = sprite_id('mage', 'idle')
+_MAGE_ATTACK = sprite_id('mage', 'attack')
+_MAGE_SPECIAL = sprite_id('mage', 'special')
+
 
 class Character:
     """
@@ -14,6 +28,12 @@ class Character:
     skill_points: int
     enemy: "Character"
 
+    # Slots instead of a per-instance __dict__ keep characters small and
+    # their attributes quick to reach when many of them are alive at once.
+    __slots__ = ('char_name', '_sprite', '_health_points',
+                 '_skill_points', '_available_actions', 'battle_queue',
+                 'playstyle', '_enemy', 'defence', '_observers')
+
     def __init__(self, char_name: str, battle_queue: "BattleQueue",
                  playstyle: "Playstyle") -> None:
         """
@@ -21,15 +41,151 @@ class Character:
         either Rouge or Mage
         """
         self.char_name = char_name.strip()
-        self.animation_state = []
-        self.health_points = 100
-        self.skill_points = 100
+        # The ID of the sprite to show next (see a1_animation).
+        self._sprite = 0
+        self._health_points = 100
+        self._skill_points = 100
+        self._available_actions = self._find_available_actions()
         self.battle_queue = battle_queue
         # self.character = self.battle_queue.peek()
         self.playstyle = playstyle
-        self.enemy = None
+        self._enemy = None
+        # Callables told about every change to HP and SP (see add_observer)
+        self._observers = ()
         # self.defence = 0
 
+    # HP, SP and enemy are properties so that every change to them (including
+    # direct assignments) is passed on to the battle queue, which caches
+    # whether the game is over and who won.
+
+    @property
+    def health_points(self) -> int:
+        """
+        The character's HP.
+        """
+        return self._health_points
+
+    @health_points.setter
+    def health_points(self, value: int) -> None:
+        changed = value != self._health_points
+        self._health_points = value
+        self.battle_queue.notify_changed(self)
+        if changed and self._observers:
+            self._notify_observers(HP_CHANGED, value)
+
+    @property
+    def skill_points(self) -> int:
+        """
+        The character's SP.
+        """
+        return self._skill_points
+
+    @skill_points.setter
+    def skill_points(self, value: int) -> None:
+        changed = value != self._skill_points
+        self._skill_points = value
+        self._available_actions = self._find_available_actions()
+        self.battle_queue.notify_changed(self)
+        if changed and self._observers:
+            self._notify_observers(SP_CHANGED, value)
+
+    def add_observer(self, observer: Callable[['Character', str, Any],
+                                              None]) -> None:
+        """
+        Call observer(self, event, value) every time this character's HP or
+        SP changes, where event is HP_CHANGED or SP_CHANGED and value is the
+        new HP or SP.
+
+        >>> from a1_battle_queue import BattleQueue
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> bq = BattleQueue()
+        >>> c = Rogue("Sophia", bq, ManualPlaystyle(bq))
+        >>> c.add_observer(lambda char, event, value: print(event, value))
+        >>> c.skill_points -= 3
+        sp 97
+        >>> c.health_points = 100
+        """
+        self._observers += (observer,)
+
+    def remove_observer(self, observer: Callable[['Character', str, Any],
+                                                 None]) -> None:
+        """
+        Stop calling observer, which was added with add_observer.
+        """
+        observers = list(self._observers)
+        observers.remove(observer)
+        self._observers = tuple(observers)
+
+    def _notify_observers(self, event: str, value: Any) -> None:
+        """
+        Tell every observer that event happened, with value.
+        """
+        for observer in self._observers:
+            observer(self, event, value)
+
+    @property
+    def animation_state(self) -> list:
+        """
+        The current animation and the frame of it to show next, as a new
+        list [sprite name prefix, frame number]. It is worked out from the
+        sprite ID, and kept for code written before sprite IDs.
+
+        >>> from a1_battle_queue import BattleQueue
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> bq = BattleQueue()
+        >>> c = Mage("Ashas", bq, ManualPlaystyle(bq))
+        >>> c.animation_state = ['mage_attack_', 9]
+        >>> c.get_next_sprite(), c.animation_state
+        ('mage_attack_9', ['mage_idle_', 0])
+        """
+        name = SPRITE_NAMES[self._sprite]
+        return [name[:name.rindex('_') + 1], self._sprite % FRAMES]
+
+    @animation_state.setter
+    def animation_state(self, value: list) -> None:
+        animation, frame = value
+        first = SPRITE_IDS[animation + '0']
+        # Past the last frame, the animation is over
+        self._sprite = (first + frame if frame < FRAMES else
+                        NEXT_SPRITE[first + FRAMES - 1])
+
+    def _start_animation(self, sprite: int) -> None:
+        """
+        Switch to the animation whose first frame has ID sprite.
+        """
+        self._sprite = sprite
+
+    @property
+    def available_actions(self) -> tuple:
+        """
+        The actions the character can make, as a tuple containing "A" and or
+        "S". This is kept up to date as the character's SP changes, so unlike
+        get_available_actions it doesn't build anything when read.
+
+        >>> from a1_battle_queue import BattleQueue
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> bq = BattleQueue()
+        >>> c = Rogue("Sophia", bq, ManualPlaystyle(bq))
+        >>> c.available_actions
+        ('S', 'A')
+        >>> c.skill_points = 5
+        >>> c.available_actions
+        ('A',)
+        """
+        return self._available_actions
+
+    @property
+    def enemy(self) -> "Character":
+        """
+        The character this character attacks.
+        """
+        return self._enemy
+
+    @enemy.setter
+    def enemy(self, value: "Character") -> None:
+        self._enemy = value
+        self.battle_queue.notify_changed(self)
+
     def __repr__(self) -> str:
         """
         Create a representation of the character in the format:
@@ -112,18 +268,41 @@ class Character:
 
         # finish the implimentation of this function
 
-    def get_next_sprite(self) -> Any:
+    def get_next_sprite(self) -> str:
         """
-        return the next sprite
+        return the next sprite's name
+
+        >>> from a1_battle_queue import BattleQueue
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> bq = BattleQueue()
+        >>> c = Rogue("Sophia", bq, ManualPlaystyle(bq))
+        >>> c.get_next_sprite(), c.get_next_sprite()
+        ('rogue_idle_0', 'rogue_idle_1')
         """
-        raise NotImplementedError
+        return SPRITE_NAMES[self.get_next_sprite_id()]
+
+    def get_next_sprite_id(self) -> int:
+        """
+        Return the ID of the next sprite (see a1_animation), and move on to
+        the one after it.
+        """
+        sprite = self._sprite
+        self._sprite = NEXT_SPRITE[sprite]
+        return sprite
 
     def get_available_actions(self) -> list:
         """
         Get the actions that the current player can make. should be a list
         containing "A" and or "S" or an empty list if there are no actions.
         """
-        raise NotImplementedError
+        return list(self._available_actions)
+
+    def _find_available_actions(self) -> tuple:
+        """
+        Work out the actions the character can make with its current SP.
+        A plain Character has none.
+        """
+        return ()
 
         # return "{} ({}): {}/{}".format(self.char_name, self.char_type,
         #                                self.health_points, self.skill_points)
@@ -146,6 +325,7 @@ class Rogue(Character):
     """
     Create the Rougue character. Inheriting from Character class
     """
+    __slots__ = ()
 
     def __init__(self, char_name: str, battle_queue: "BattleQueue",
                  playstyle: "Playstyle") -> None:
@@ -156,7 +336,7 @@ class Rogue(Character):
         super().__init__(char_name, battle_queue, playstyle)
         # self.char_type = "Rogue"
         self.defence = 10
-        self.animation_state = ["rogue_idle_", 0]
+        self._start_animation(_ROGUE_IDLE)
 
     def __repr__(self) -> str:
         """
@@ -204,37 +384,15 @@ class Rogue(Character):
             return self.skill_points >= 10
         return False
 
-    def get_next_sprite(self) -> str:
-        """
-        return the next sprite
-        """
-
-        if self.animation_state[1] > 9:
-            self.animation_state = ["rogue_idle_", 0]
-
-        image_num = self.animation_state[1]  # 0
-        string = self.animation_state[0]  # "rogue_idle_"
-        # return_str = ""
-
-        # while image_num <= 9:
-        string += str(image_num)
-
-        self.animation_state[1] += 1
-
-        # old_state = self.animation_state[0]
-
-        return string
-
-    def get_available_actions(self) -> list:
+    def _find_available_actions(self) -> tuple:
         """
-        Get the actions that the current player can make. should be a list
-        containing "A" and or "S" or an empty list if there are no actions.
+        Work out the actions the Rogue can make with its current SP.
         """
         action_list = []
 
-        if self.skill_points >= 10:
+        if self._skill_points >= 10:
             action_list.append("S")
-        if self.skill_points >= 3:
+        if self._skill_points >= 3:
             action_list.append("A")
 
         # if self.battle_queue.peek().skill_points >= 10:
@@ -242,7 +400,7 @@ class Rogue(Character):
         # if self.battle_queue.peek().skill_points >= 3:
         #     action_list.append("S")
 
-        return action_list
+        return tuple(action_list)
 
     def attack(self) -> None:
         """
@@ -255,7 +413,7 @@ class Rogue(Character):
             -> takes 3 skill points
         """
         self.skill_points -= 3
-        self.animation_state = ["rogue_attack_", 0]
+        self._start_animation(_ROGUE_ATTACK)
         if self.enemy.health_points - (15 - self.enemy.defence) >= 0:
             self.enemy.health_points -= (15 - self.enemy.defence)
         else:
@@ -273,7 +431,7 @@ class Rogue(Character):
             -> takes 10 skill points
         """
         self.skill_points -= 10
-        self.animation_state = ["rogue_special_", 0]
+        self._start_animation(_ROGUE_SPECIAL)
 
         if self.enemy.health_points - (20 - self.enemy.defence) >= 0:
             self.enemy.health_points -= (20 - self.enemy.defence)
@@ -293,6 +451,7 @@ class Mage(Character):
     """
     Create the Mage Character. Inheriting from Character class
     """
+    __slots__ = ()
 
     def __init__(self, char_name: str, battle_queue: "BattleQueue",
                  playstyle: "Playstyle") -> None:
@@ -303,7 +462,7 @@ class Mage(Character):
         super().__init__(char_name, battle_queue, playstyle)
         # self.char_type = "Mage"
         self.defence = 8
-        self.animation_state = ["mage_idle_", 0]
+        self._start_animation(_MAGE_IDLE)
 
     def __repr__(self) -> str:
         """
@@ -351,29 +510,9 @@ class Mage(Character):
             return self.skill_points >= 30
         return False
 
-    def get_next_sprite(self) -> str:
-        """
-        return the next sprite
+    def _find_available_actions(self) -> tuple:
         """
-
-        if self.animation_state[1] > 9:
-            self.animation_state = ["mage_idle_", 0]
-
-        image_num = self.animation_state[1]  # 0
-        string = self.animation_state[0]  # "rogue_idle_"
-
-        # return_str = ""
-
-        # while image_num <= 9:
-        string += str(image_num)
-        self.animation_state[1] += 1
-
-        return string
-
-    def get_available_actions(self) -> list:
-        """
-        Get the actions that the current player can make. should be a list
-        containing "A" and or "S" or an empty list if there are no actions.
+        Work out the actions the Mage can make with its current SP.
 
         Valid actions for Mage:
         "A":
@@ -387,12 +526,12 @@ class Mage(Character):
         """
         action_list = []
 
-        if self.skill_points >= 30:
+        if self._skill_points >= 30:
             action_list.append("S")
-        if self.skill_points >= 5:
+        if self._skill_points >= 5:
             action_list.append("A")
 
-        return action_list
+        return tuple(action_list)
 
     def attack(self) -> None:
         """
@@ -406,7 +545,7 @@ class Mage(Character):
             -> takes 5 skill points
         """
         self.skill_points -= 5
-        self.animation_state = ["mage_attack_", 0]
+        self._start_animation(_MAGE_ATTACK)
 
         if self.enemy.health_points - (20 - self.enemy.defence) >= 0:
             self.enemy.health_points -= (20 - self.enemy.defence)
@@ -428,7 +567,7 @@ class Mage(Character):
         """
 
         self.skill_points -= 30
-        self.animation_state = ["mage_special_", 0]
+        self._start_animation(_MAGE_SPECIAL)
 
         if self.enemy.health_points - (40 - self.enemy.defence) >= 0:
             self.enemy.health_points -= (40 - self.enemy.defence)
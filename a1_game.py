@@ -12,9 +12,9 @@ statements that are required.
 Do NOT run PythonTA on this file.
 We will not grade the documentation of this file.
 """
-from a1_battle_queue import BattleQueue
-from a1_playstyle import ManualPlaystyle, RandomPlaystyle
-from a1_character_class import Mage, Rogue
+from a1_battle_queue import BattleQueue, TURN_CHANGED
+from a1_playstyle import ManualPlaystyle, OptimalPlaystyle, RandomPlaystyle
+from a1_character_class import HP_CHANGED, SP_CHANGED, Mage, Rogue
 
 # Replace None with the name of your Character classes
 # m should map to your class for your Mage
@@ -25,8 +25,10 @@ CHARACTER_CLASSES = {'m': Mage,
 
 # Replace None with the name of your Playstyle classes
 # r should map to your class for your random playstyle
+# o maps to the perfect-play playstyle backed by a1_solver
 PLAYSTYLE_CLASSES = {'m': ManualPlaystyle,
-                     'r': RandomPlaystyle
+                     'r': RandomPlaystyle,
+                     'o': OptimalPlaystyle
                     }
 
 # Do not change any of the code below
@@ -41,52 +43,268 @@ P2 = None
 GAME_IS_OVER = False
 GAME_WINNER = None
 
-def perform_attack():
+
+class GameSession:
     """
-    Uses the next character's playstyle to decide on and perform an attack.
+    One game: its battle queue, its two characters and its result so far.
+
+    Any number of GameSessions can be played side by side. The functions
+    below play the default session, kept in sync with the globals above.
+
+    battle_queue - The BattleQueue of this game.
+    p1, p2 - The first and second characters.
+    game_is_over - Whether the game was over after the last attack.
+    game_winner - The winner after the last attack, if there is one.
+    last_key_pressed - The key that manual playstyles pick a move from.
     """
-    global BATTLE_QUEUE, GAME_IS_OVER, GAME_WINNER, LAST_KEY_PRESSED
-
-    # Get the next character in the battle queue, but don't remove them.
-    next_character = BATTLE_QUEUE.peek()
-    playstyle = next_character.playstyle
-
-    # Uses the next character's playstyle to select an attack
-    if playstyle.is_manual:
-        move_to_make = playstyle.select_attack(LAST_KEY_PRESSED)
-    else:
-        move_to_make = playstyle.select_attack()
-
-    # Check if the next_character can make that action ('A' represents
-    # a normal attack, 'S' represents a special attack.)
-    # If a move that is not 'A' or 'S' is passed in, this should return False.
-    if next_character.is_valid_action(move_to_make):
-        if move_to_make == 'A':
-            next_character.attack()
+    __slots__ = ('battle_queue', 'p1', 'p2', 'game_is_over', 'game_winner',
+                 'last_key_pressed', '_watched', '_changes', '_current')
+
+    def __init__(self, battle_queue=None, p1=None, p2=None):
+        """
+        Initialize a session playing the game between p1 and p2 in
+        battle_queue (which are None until it is set up).
+        """
+        self.battle_queue = battle_queue
+        self.p1 = p1
+        self.p2 = p2
+        self.game_is_over = False
+        self.game_winner = None
+        self.last_key_pressed = None
+        # The (battle queue, p1, p2) update_ui_diff is following the
+        # changes of, the changes since its last call and whose turn it is.
+        self._watched = None
+        self._changes = {}
+        self._current = None
+
+    @classmethod
+    def new(cls, p1_class='r', p2_class='m', p1_playstyle='r',
+            p2_playstyle='r', p1_name='Player 1', p2_name='Player 2',
+            queue_class=BattleQueue):
+        """
+        Return a session for a new game between a p1_class and a p2_class
+        character (keys of CHARACTER_CLASSES) with the given playstyles (keys
+        of PLAYSTYLE_CLASSES) and names, in a battle queue of queue_class.
+
+        >>> session = GameSession.new('r', 'm')
+        >>> session.battle_queue.peek()
+        Player 1 (Rogue): 100/100
+        """
+        # Create a new battle queue
+        battle_queue = queue_class()
+
+        # Call the corresponding __init__ for each player's character class
+        # The parameters passed in are: their name, the battle queue and an
+        # instance of their playstyle
+        p1 = CHARACTER_CLASSES[p1_class](
+            p1_name, battle_queue,
+            PLAYSTYLE_CLASSES[p1_playstyle](battle_queue))
+        p2 = CHARACTER_CLASSES[p2_class](
+            p2_name, battle_queue,
+            PLAYSTYLE_CLASSES[p2_playstyle](battle_queue))
+
+        # Set the enemy attribute of the characters
+        # You can assume this will be called before any attacks are performed
+        p1.enemy = p2
+        p2.enemy = p1
+
+        # Add the characters to the Battle Queue
+        battle_queue.add(p1)
+        battle_queue.add(p2)
+        return cls(battle_queue, p1, p2)
+
+    def perform_attack(self):
+        """
+        Uses the next character's playstyle to decide on and perform an
+        attack.
+
+        >>> import random
+        >>> random.seed(0)
+        >>> session = GameSession.new('r', 'm')
+        >>> while not session.game_is_over:
+        ...     session.perform_attack()
+        >>> session.game_winner
+        Player 1 (Rogue): 30/21
+        """
+        battle_queue = self.battle_queue
+
+        # Get the next character in the battle queue, but don't remove them.
+        next_character = battle_queue.peek()
+        playstyle = next_character.playstyle
+
+        # Uses the next character's playstyle to select an attack
+        if playstyle.is_manual:
+            move_to_make = playstyle.select_attack(self.last_key_pressed)
+        else:
+            move_to_make = playstyle.select_attack()
+
+        # Check if the next_character can make that action ('A' represents
+        # a normal attack, 'S' represents a special attack.)
+        # If a move that is not 'A' or 'S' is passed in, this should return
+        # False.
+        if next_character.is_valid_action(move_to_make):
+            if move_to_make == 'A':
+                next_character.attack()
+            else:
+                next_character.special_attack()
+
+            # Call remove() to remove the next_character from the battle_queue
+            # (if they still have SP; otherwise the next call to remove()
+            # should skip them)
+            if next_character.get_available_actions() != []:
+                battle_queue.remove()
+
+        # Check if the game is over.
+        self.game_is_over = battle_queue.is_over()
+
+        # Get the winner of the game. If the game is not over yet,
+        # get_winner() should return None. Otherwise, it should return the
+        # character that won.
+        self.game_winner = battle_queue.get_winner()
+
+    def update_ui(self, sprite_ids=False):
+        """
+        Return the parameters to update the UI for the game. The sprites are
+        given by name, or by ID (see a1_animation) if sprite_ids is True.
+        """
+        p1, p2, battle_queue = self.p1, self.p2, self.battle_queue
+
+        if not battle_queue.is_over():
+            # Get the actions that the current player can make (this should be
+            # a list containing 'A' and/or 'S', or be empty if there are no
+            # actions.)
+            current = battle_queue.peek()
+            current_available_actions = current.get_available_actions()
+
+            # Get the current player's name
+            current_player = current.get_name()
         else:
-            next_character.special_attack()
+            current_available_actions = []
+            current_player = None
 
-        # Call remove() to remove the next_character from the battle_queue
-        # (if they still have SP; otherwise the next call to remove()
-        # should skip them)
-        if next_character.get_available_actions() != []:
-            BATTLE_QUEUE.remove()
+        if sprite_ids:
+            p1_sprite = p1.get_next_sprite_id()
+            p2_sprite = p2.get_next_sprite_id()
+        else:
+            p1_sprite = p1.get_next_sprite()
+            p2_sprite = p2.get_next_sprite()
+
+        return {'p1_sprite': p1_sprite,
+                'p2_sprite': p2_sprite,
+                'p1_hp': p1.get_hp(),
+                'p2_hp': p2.get_hp(),
+                'p1_sp': p1.get_sp(),
+                'p2_sp': p2.get_sp(),
+                'p1_name': p1.get_name(),
+                'p2_name': p2.get_name(),
+                'actions': current_available_actions,
+                'current_player': current_player}
+
+    def update_ui_diff(self, sprite_ids=False):
+        """
+        Return the parameters from update_ui that changed since the last
+        call (all of them on the first call, or after a new game is set up).
+        The sprites are always included, since they animate, and are given
+        as in update_ui.
+
+        >>> session = GameSession.new('r', 'm')
+        >>> len(session.update_ui_diff())
+        10
+        >>> session.perform_attack()
+        >>> sorted(session.update_ui_diff())
+        ['actions', 'current_player', 'p1_sp', 'p1_sprite', 'p2_hp', \
+'p2_sprite']
+        """
+        if self._watched is None or any(
+                watched is not current for watched, current in zip(
+                    self._watched, (self.battle_queue, self.p1, self.p2))):
+            self._watch()
+            return self.update_ui(sprite_ids)
+        changes = self._changes
+        self._changes = {}
+        if sprite_ids:
+            changes['p1_sprite'] = self.p1.get_next_sprite_id()
+            changes['p2_sprite'] = self.p2.get_next_sprite_id()
+        else:
+            changes['p1_sprite'] = self.p1.get_next_sprite()
+            changes['p2_sprite'] = self.p2.get_next_sprite()
+        return changes
+
+    def _watch(self):
+        """
+        Start following the changes to this session's game, and stop
+        following the game it followed before.
+
+        >>> session = GameSession.new('r', 'm')
+        >>> _ = session.update_ui_diff()
+        >>> old = session.p1
+        >>> session.p1 = GameSession.new('r', 'm').p1
+        >>> _ = session.update_ui_diff()
+        >>> old._observers
+        ()
+        """
+        if self._watched is not None:
+            for watched in self._watched:
+                watched.remove_observer(self._on_change)
+        self._watched = (self.battle_queue, self.p1, self.p2)
+        for watched in self._watched:
+            watched.add_observer(self._on_change)
+        self._changes = {}
+        self._current = (None if self.battle_queue.is_over() else
+                         self.battle_queue.peek())
+
+    def _on_change(self, source, event, value):
+        """
+        Record the change to the parameters of update_ui that event, sent by
+        source with value, makes.
+        """
+        changes = self._changes
+        if event == TURN_CHANGED:
+            self._current = value
+            if value is None:
+                changes['current_player'] = None
+                changes['actions'] = []
+            else:
+                changes['current_player'] = value.get_name()
+                changes['actions'] = value.get_available_actions()
+        elif event in (HP_CHANGED, SP_CHANGED):
+            player = 'p1_' if source is self.p1 else 'p2_'
+            changes[player + event] = value
+            if event == SP_CHANGED and source is self._current:
+                changes['actions'] = source.get_available_actions()
+
+
+# The session the functions below play.
+DEFAULT_SESSION = GameSession()
+
+def _default_session():
+    """
+    Return the default session, brought up to date with the globals (which
+    a1_ui and other tools may have set directly).
+    """
+    session = DEFAULT_SESSION
+    session.battle_queue = BATTLE_QUEUE
+    session.p1 = P1
+    session.p2 = P2
+    session.last_key_pressed = LAST_KEY_PRESSED
+    return session
 
-    # Check if the game is over.
-    GAME_IS_OVER = BATTLE_QUEUE.is_over()
+def perform_attack():
+    """
+    Uses the next character's playstyle to decide on and perform an attack.
+    """
+    global GAME_IS_OVER, GAME_WINNER
 
-    # Get the winner of the game. If the game is not over yet, get_winner()
-    # should return None. Otherwise, it should return the character that won.
-    GAME_WINNER = BATTLE_QUEUE.get_winner()
+    session = _default_session()
+    session.perform_attack()
+    GAME_IS_OVER = session.game_is_over
+    GAME_WINNER = session.game_winner
 
 def set_up_game():
     """
     Sets up the battle queue and characters for the game.
     """
-    global P1, P2, BATTLE_QUEUE
-
-    # Create a new battle queue
-    BATTLE_QUEUE = BattleQueue()
+    global P1, P2, BATTLE_QUEUE, GAME_IS_OVER, GAME_WINNER
 
     # Get the parameters for the first character
     player_1 = ''
@@ -98,9 +316,10 @@ def set_up_game():
 
     player_1_name = input("Select a name for the first character: ").strip()
 
-    while player_1_playstyle not in ["m", "r"]:
+    while player_1_playstyle not in PLAYSTYLE_CLASSES:
         player_1_playstyle = input("Select a playstyle for the first " +
-                                   "character (m for Manual, r for Random): ")
+                                   "character (m for Manual, r for Random, " +
+                                   "o for Optimal): ")
         player_1_playstyle = player_1_playstyle.strip()
 
     # Get the parameters for the second character
@@ -113,78 +332,32 @@ def set_up_game():
 
     player_2_name = input("Select a name for the second character: ").strip()
 
-    while player_2_playstyle not in ["m", "r"]:
+    while player_2_playstyle not in PLAYSTYLE_CLASSES:
         player_2_playstyle = input("Select a playstyle for the second " +
-                                   "character (m for Manual, r for Random): ")
+                                   "character (m for Manual, r for Random, " +
+                                   "o for Optimal): ")
         player_2_playstyle = player_2_playstyle.strip()
 
-    # Store the classes in other variable names for convenience
-    P1_Character = CHARACTER_CLASSES[player_1]
-    P2_Character = CHARACTER_CLASSES[player_2]
-    p1_playstyle = PLAYSTYLE_CLASSES[player_1_playstyle](BATTLE_QUEUE)
-    p2_playstyle = PLAYSTYLE_CLASSES[player_2_playstyle](BATTLE_QUEUE)
-
-    # Call the corresponding __init__ for each player's character class
-    # The parameters passed in are: their name, the battle queue and an
-    # instance of their playstyle
-    P1 = P1_Character(player_1_name, BATTLE_QUEUE, p1_playstyle)
-    P2 = P2_Character(player_2_name, BATTLE_QUEUE, p2_playstyle)
+    session = GameSession.new(player_1, player_2, player_1_playstyle,
+                              player_2_playstyle, player_1_name,
+                              player_2_name)
+    BATTLE_QUEUE, P1, P2 = session.battle_queue, session.p1, session.p2
+    GAME_IS_OVER = False
+    GAME_WINNER = None
 
-    # Set the enemy attribute of the characters
-    # You can assume this will be called before any attacks are performed
-    P1.enemy = P2
-    P2.enemy = P1
-
-    # Add the characters to the Battle Queue
-    BATTLE_QUEUE.add(P1)
-    BATTLE_QUEUE.add(P2)
-
-def update_ui():
+def update_ui(sprite_ids=False):
     """
-    Return the parameters to update the UI for the game.
+    Return the parameters to update the UI for the game. The sprites are
+    given by name, or by ID (see a1_animation) if sprite_ids is True.
 
     Note: This function is a bit silly, but the alternative was either calling
     pygame methods here, or having you read through a1_ui.py to find client
     code. Silly is the better option, in this case. :)
     """
-    global P1, P2, BATTLE_QUEUE
-
-    # Get the names
-    p1_name = P1.get_name()
-    p2_name = P2.get_name()
-
-    # Get the sprite to draw
-    p1_current_sprite = P1.get_next_sprite()
-    p2_current_sprite = P2.get_next_sprite()
-
-    # Get the character HPs
-    p1_current_hp = P1.get_hp()
-    p2_current_hp = P2.get_hp()
-
-    # Get the character SPs
-    p1_current_sp = P1.get_sp()
-    p2_current_sp = P2.get_sp()
-
-    if not BATTLE_QUEUE.is_over():
-        # Get the actions that the current player can make (this should be a
-        # list containing 'A' and/or 'S', or be empty if there are no actions.)
-        current_available_actions = BATTLE_QUEUE.peek().get_available_actions()
-
-        # Get the current player's name
-        current_player = BATTLE_QUEUE.peek().get_name()
-    else:
-        current_available_actions = []
-        current_player = None
-
-    ui_to_draw = {'p1_sprite': p1_current_sprite,
-                  'p2_sprite': p2_current_sprite,
-                  'p1_hp': p1_current_hp,
-                  'p2_hp': p2_current_hp,
-                  'p1_sp': p1_current_sp,
-                  'p2_sp': p2_current_sp,
-                  'p1_name': p1_name,
-                  'p2_name': p2_name,
-                  'actions': current_available_actions,
-                  'current_player': current_player}
-
-    return ui_to_draw
+    return _default_session().update_ui(sprite_ids)
+
+def update_ui_diff(sprite_ids=False):
+    """
+    Return the parameters from update_ui that changed since the last call.
+    """
+    return _default_session().update_ui_diff(sprite_ids)
@@ -0,0 +1,133 @@
+"""
+A fixed-timestep scheduler for the A1 UI.
+
+The game's logic (random players' moves and animation frames) advances in
+fixed ticks of game time, and game time follows the wall clock: if a frame
+takes longer than a tick, the ticks it fell behind by are caught up on the
+next frame, so the game runs at the same speed however long drawing takes.
+Drawing happens separately, at most max_fps times a second and only when a
+tick has changed something.
+
+In turbo mode game time stops following the wall clock: ticks run back to
+back, as many as fit between two frames, to fast-forward a battle. (The UI
+only does that while nobody is waiting for a player's key press.)
+"""
+import time
+from typing import Callable, Optional
+
+# The most ticks caught up on in one frame. If the game falls further behind
+# than that (e.g. the window was being dragged) the rest is dropped, rather
+# than running a burst of moves all at once.
+MAX_CATCH_UP = 10
+
+
+class FixedTimestep:
+    """
+    Schedules ticks of tick seconds of game time and frames at most max_fps
+    times a second (every tick, if max_fps is None).
+
+    turbo - Whether ticks run as fast as possible instead of in real time.
+    ticks - The number of ticks run so far.
+    """
+    turbo: bool
+    ticks: int
+
+    def __init__(self, tick: float, max_fps: Optional[float] = None,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        """
+        Initialize a scheduler whose game time starts now on clock.
+        """
+        self.tick = tick
+        self.frame_time = 1 / max_fps if max_fps else 0.0
+        self.turbo = False
+        self.ticks = 0
+        self._clock = clock
+        self._last = clock()
+        self._lag = 0.0
+        self._last_frame = None
+        self._ticks_at_frame = 0
+
+    def ticks_due(self) -> range:
+        """
+        Return the numbers of the ticks that should run now to keep game time
+        in step with the wall clock (counting from 1), and count them as run.
+
+        >>> now = [0.0]
+        >>> scheduler = FixedTimestep(0.1, clock=lambda: now[0])
+        >>> now[0] = 0.25
+        >>> list(scheduler.ticks_due())
+        [1, 2]
+        >>> now[0] = 0.3
+        >>> list(scheduler.ticks_due())
+        [3]
+        >>> now[0] = 60.0
+        >>> len(scheduler.ticks_due()) == MAX_CATCH_UP
+        True
+
+        Catching up several ticks in one frame runs each tick number once:
+
+        >>> scheduler = FixedTimestep(0.1, clock=lambda: now[0])
+        >>> ticks = []
+        >>> for frame in range(1, 51):
+        ...     now[0] = 60.0 + frame * 0.3
+        ...     ticks.extend(scheduler.ticks_due())
+        >>> ticks == list(range(1, 151))
+        True
+        """
+        now = self._clock()
+        self._lag += now - self._last
+        self._last = now
+        due = int(self._lag / self.tick + 1e-9)
+        if due > MAX_CATCH_UP:
+            due = MAX_CATCH_UP
+            self._lag = 0.0
+        else:
+            self._lag -= due * self.tick
+        first = self.ticks + 1
+        self.ticks += due
+        return range(first, self.ticks + 1)
+
+    def turbo_tick_due(self) -> bool:
+        """
+        Return whether another turbo tick fits in before the next frame, and
+        count it as run if so. At least one tick runs between frames.
+
+        >>> now = [0.0]
+        >>> scheduler = FixedTimestep(0.1, max_fps=10, clock=lambda: now[0])
+        >>> scheduler.turbo_tick_due(), scheduler.turbo_tick_due()
+        (True, False)
+        >>> scheduler.frame_drawn()
+        >>> now[0] = 0.05
+        >>> scheduler.turbo_tick_due(), scheduler.turbo_tick_due()
+        (True, True)
+        >>> now[0] = 0.1
+        >>> scheduler.turbo_tick_due()
+        False
+        """
+        if self.frame_due() and self.ticks > self._ticks_at_frame:
+            return False
+        self.ticks += 1
+        self._last = self._clock()
+        self._lag = 0.0
+        return True
+
+    def frame_due(self) -> bool:
+        """
+        Return whether enough time has passed since the last frame to draw
+        another.
+        """
+        return (self._last_frame is None or
+                self._clock() - self._last_frame >= self.frame_time)
+
+    def frame_drawn(self) -> None:
+        """
+        Record that a frame was just drawn.
+        """
+        self._last_frame = self._clock()
+        self._ticks_at_frame = self.ticks
+
+    def time_until_due(self) -> float:
+        """
+        Return the seconds until the next tick is due.
+        """
+        return max(self.tick - self._lag - (self._clock() - self._last), 0.0)
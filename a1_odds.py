@@ -0,0 +1,177 @@
+"""
+Exact outcome probabilities for A1 battles.
+
+Simulating millions of battles only estimates how often each side wins.
+Instead, this walks every position a battle can reach (using the position
+encoding and rules from a1_solver), weighting each move by how likely the
+mover's playstyle is to pick it. That gives the exact probability of every
+outcome in a1_simulate.OUTCOMES and the expected battle length.
+
+Results for every position are remembered, so later queries about the same
+matchup, including from the middle of a battle, come from the table.
+
+Run it from the command line to print the odds of every pairing:
+    python a1_odds.py
+"""
+import time
+from typing import Dict, List, Tuple
+
+from a1_game import CHARACTER_CLASSES
+from a1_rules import random_playstyle_moves
+from a1_simulate import OUTCOMES, P1_WIN, P2_WIN, STALLED, TIE
+from a1_solver import Matchup, solver_for
+
+# The playstyles (keys of a1_game.PLAYSTYLE_CLASSES) odds can be worked out
+# for.
+PLAYSTYLES = ('r', 'o')
+
+# The probabilities of (P1_WIN, P2_WIN, TIE, STALLED) and the expected number
+# of turns left.
+Odds = Tuple[float, float, float, float, float]
+
+_RESULTS = {1: (1.0, 0.0, 0.0, 0.0, 0.0),
+            -1: (0.0, 1.0, 0.0, 0.0, 0.0),
+            0: (0.0, 0.0, 1.0, 0.0, 0.0)}
+_STALLED = (0.0, 0.0, 0.0, 1.0, 0.0)
+
+
+class OddsTable:
+    """
+    Works out the odds of positions in battles between a p1_class character
+    playing p1_playstyle and a p2_class character playing p2_playstyle,
+    remembering every position it has worked out.
+    """
+    matchup: Matchup
+    table: Dict[int, Odds]
+
+    def __init__(self, p1_class: type, p2_class: type,
+                 p1_playstyle: str = 'r', p2_playstyle: str = 'r') -> None:
+        """
+        Initialize an empty OddsTable for the given classes and playstyles.
+        """
+        for playstyle in (p1_playstyle, p2_playstyle):
+            if playstyle not in PLAYSTYLES:
+                raise ValueError("Odds can only be worked out for the {} "
+                                 "playstyles.".format(', '.join(PLAYSTYLES)))
+        self.playstyles = (p1_playstyle, p2_playstyle)
+        self.matchup = Matchup(p1_class, p2_class)
+        self.table = {}
+        self._solver = None
+        if 'o' in self.playstyles:
+            self._solver = solver_for(p1_class, p2_class)
+
+    def _choices(self, position: int) -> List[Tuple[str, float]]:
+        """
+        Return each move the next mover's playstyle might pick in position
+        with the probability of picking it.
+        """
+        mover = self.matchup.mover(position)
+        if self.playstyles[mover] == 'o':
+            return [(self._solver.best_move(position), 1.0)]
+        sp = self.matchup.decode(position)[1 + 2 * mover]
+        moves = random_playstyle_moves(
+            (self.matchup.p1_class, self.matchup.p2_class)[mover], sp)
+        return [(move, 1 / len(moves)) for move in moves]
+
+    def odds(self, position: int) -> Odds:
+        """
+        Return the odds of position.
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> t = OddsTable(Rogue, Mage)
+        >>> t.odds(t.matchup.encode(100, 100, 5, 100, [0, 1]))
+        (1.0, 0.0, 0.0, 0.0, 1.0)
+        >>> t.odds(t.matchup.encode(100, 3, 100, 0, [])) # one more turn
+        (0.0, 0.0, 1.0, 0.0, 1.0)
+        """
+        odds = self.table.get(position)
+        if odds is not None:
+            return odds
+
+        matchup = self.matchup
+        result = matchup.result(position)
+        choices = self._choices(position) if result is None else []
+        if result is not None:
+            odds = _RESULTS[result]
+        elif not choices:
+            # The playstyle has nothing to pick, so the game waits forever.
+            odds = _STALLED
+        else:
+            legal = matchup.moves(position)
+            totals = [0.0] * 5
+            for move, chance in choices:
+                if move in legal:
+                    after = self.odds(matchup.play(position, move))
+                    # The move itself takes a turn.
+                    after = after[:4] + (after[4] + 1,)
+                else:
+                    after = _STALLED
+                for i, value in enumerate(after):
+                    totals[i] += chance * value
+            odds = tuple(totals)
+        self.table[position] = odds
+        return odds
+
+
+_TABLES = {}
+
+
+def odds_table(p1_class: type, p2_class: type, p1_playstyle: str = 'r',
+               p2_playstyle: str = 'r') -> OddsTable:
+    """
+    Return the shared OddsTable for the given classes and playstyles,
+    creating it the first time it's asked for.
+    """
+    key = (p1_class, p2_class, p1_playstyle, p2_playstyle)
+    if key not in _TABLES:
+        _TABLES[key] = OddsTable(*key)
+    return _TABLES[key]
+
+
+def battle_odds(p1_class: str = 'r', p2_class: str = 'm',
+                p1_playstyle: str = 'r', p2_playstyle: str = 'r'
+                ) -> Dict[str, float]:
+    """
+    Return the probability of each outcome (from p1's point of view) of a
+    battle set up like a1_simulate.set_up_battle does, and its expected
+    number of turns, in the same form as a1_simulate.run_battles.
+
+    >>> odds = battle_odds('r', 'm')
+    >>> round(sum(odds[outcome] for outcome in OUTCOMES), 9)
+    1.0
+    >>> round(odds[P1_WIN], 4), round(odds['average_turns'], 2)
+    (0.9249, 14.2)
+    """
+    table = odds_table(CHARACTER_CLASSES[p1_class],
+                       CHARACTER_CLASSES[p2_class], p1_playstyle,
+                       p2_playstyle)
+    odds = table.odds(table.matchup.start())
+    summary = dict(zip(OUTCOMES, odds[:4]))
+    summary['average_turns'] = odds[4]
+    return summary
+
+
+def main() -> None:
+    """
+    Print the odds of every pairing of classes and playstyles.
+    """
+    print("{:<8} {:>9} {:>9} {:>9} {:>9} {:>8}".format(
+        "pairing", "p1 wins", "p2 wins", "ties", "stalled", "turns"))
+    start = time.perf_counter()
+    for p1_class in CHARACTER_CLASSES:
+        for p2_class in CHARACTER_CLASSES:
+            for p1_playstyle in PLAYSTYLES:
+                for p2_playstyle in PLAYSTYLES:
+                    odds = battle_odds(p1_class, p2_class, p1_playstyle,
+                                       p2_playstyle)
+                    print("{:<8} {:>9.4f} {:>9.4f} {:>9.4f} {:>9.4f} "
+                          "{:>8.2f}".format(
+                              '-'.join((p1_class, p2_class, p1_playstyle,
+                                        p2_playstyle)),
+                              odds[P1_WIN], odds[P2_WIN], odds[TIE],
+                              odds[STALLED], odds['average_turns']))
+    print("Worked out in {:.2f}s".format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+A batch match runner for A1, streaming JSON lines in and out.
+
+Each input line is one match spec, a JSON object like:
+    {"id": "m1", "p1": "r", "p2": "m", "p1_name": "Ann", "p2_name": "Bob",
+     "p1_playstyle": "r", "p2_playstyle": "o", "seed": 1}
+Classes and playstyles are keys of a1_game.CHARACTER_CLASSES and
+PLAYSTYLE_CLASSES (playstyles must be automatic). Every field is optional
+and defaults like a1_simulate.set_up_battle; a match with a seed plays the
+same way every time (and the same way as on a1_server with that seed).
+
+Each match is played headlessly as soon as it is read, and its result is
+written out as one JSON line, in input order:
+    {"line": 1, "id": "m1" (if the spec had one), "outcome": one of
+     a1_simulate.OUTCOMES, "winner": the winner's name or null, "turns": 14,
+     "p1": [HP, SP], "p2": [HP, SP]}
+A spec that can't be played gets {"line": 1, "error": "..."} instead.
+
+Only a bounded number of matches are in memory at any time, so inputs of
+any length can be streamed through. With --workers, chunks of matches are
+played on a process pool, with a bounded number of chunks in flight.
+
+Run it from the command line, e.g.:
+    python a1_pipeline.py specs.jsonl results.jsonl --workers 8
+    python a1_pipeline.py < specs.jsonl > results.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from a1_game import CHARACTER_CLASSES, PLAYSTYLE_CLASSES
+from a1_simulate import (P1_WIN, P2_WIN, automatic_playstyles, play_battle,
+                         seed_playstyles, set_up_battle)
+
+# The spec fields naming classes and playstyles, with their defaults.
+_CLASS_FIELDS = (('p1', 'r'), ('p2', 'm'))
+_PLAYSTYLE_FIELDS = (('p1_playstyle', 'r'), ('p2_playstyle', 'r'))
+_NAME_FIELDS = (('p1_name', 'Player 1'), ('p2_name', 'Player 2'))
+_AUTOMATIC_PLAYSTYLES = frozenset(automatic_playstyles())
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def run_match(line_number: int, line: str) -> dict:
+    """
+    Play the match specified by line, line number line_number of the
+    input, and return its result row.
+
+    >>> run_match(1, '{"id": 7, "p1": "r", "p2": "m", "seed": 1}')
+    {'line': 1, 'id': 7, 'outcome': 'p1', 'winner': 'Player 1', \
+'turns': 14, 'p1': [10, 32], 'p2': [0, 10]}
+    >>> run_match(2, '{"p1": "x"}')
+    {'line': 2, 'error': 'unknown class x'}
+    """
+    row = {'line': line_number}
+    try:
+        spec = json.loads(line)
+    except ValueError:
+        spec = None
+    if not isinstance(spec, dict):
+        row['error'] = "specs must be JSON objects"
+        return row
+    if 'id' in spec:
+        row['id'] = spec['id']
+
+    classes = [spec.get(field, default) for field, default in _CLASS_FIELDS]
+    playstyles = [spec.get(field, default)
+                  for field, default in _PLAYSTYLE_FIELDS]
+    names = [spec.get(field, default) for field, default in _NAME_FIELDS]
+    for key in classes:
+        if not isinstance(key, str) or key not in CHARACTER_CLASSES:
+            row['error'] = "unknown class {}".format(key)
+            return row
+    for key in playstyles:
+        if not isinstance(key, str) or key not in PLAYSTYLE_CLASSES:
+            row['error'] = "unknown playstyle {}".format(key)
+            return row
+        if key not in _AUTOMATIC_PLAYSTYLES:
+            row['error'] = "playstyle {} needs a player".format(key)
+            return row
+    if not all(isinstance(name, str) for name in names):
+        row['error'] = "names must be strings"
+        return row
+
+    battle_queue, p1, p2 = set_up_battle(*classes, *playstyles, *names)
+    seed = spec.get('seed')
+    if seed is not None:
+        seed_playstyles(p1, p2, seed)
+    outcome, turns = play_battle(battle_queue, p1)
+
+    row['outcome'] = outcome
+    row['winner'] = (p1.get_name() if outcome == P1_WIN else
+                     p2.get_name() if outcome == P2_WIN else None)
+    row['turns'] = turns
+    row['p1'] = [p1.get_hp(), p1.get_sp()]
+    row['p2'] = [p2.get_hp(), p2.get_sp()]
+    return row
+
+
+def _run_chunk(chunk: List[Tuple[int, str]]) -> str:
+    """
+    Play every (line number, spec line) in chunk and return their result
+    rows as JSON lines.
+    """
+    return ''.join(json.dumps(run_match(line_number, line)) + '\n'
+                   for line_number, line in chunk)
+
+
+def _chunks(lines: Iterable[str], chunk_size: int
+            ) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Yield the non-blank lines of lines with their line numbers (from 1), in
+    lists of up to chunk_size.
+    """
+    numbered = ((line_number, line)
+                for line_number, line in enumerate(lines, 1)
+                if line.strip())
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_pipeline(lines: Iterable[str], output: TextIO,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Play the match specified by every line of lines and write their result
+    rows to output in order, on workers processes (in this process if
+    workers is None). Return the number of matches played.
+
+    >>> import io
+    >>> output = io.StringIO()
+    >>> run_pipeline(['{"seed": 1}', '', '{"p2": "r", "seed": 2}'], output)
+    2
+    >>> [json.loads(row)['line'] for row in output.getvalue().splitlines()]
+    [1, 3]
+    """
+    matches = 0
+    if workers is None:
+        for chunk in _chunks(lines, chunk_size):
+            output.write(_run_chunk(chunk))
+            matches += len(chunk)
+        return matches
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep two chunks per worker in flight: enough to keep every worker
+        # busy, without reading ahead through the whole input.
+        pending = deque()
+        for chunk in _chunks(lines, chunk_size):
+            if len(pending) >= 2 * workers:
+                output.write(pending.popleft().result())
+            pending.append(executor.submit(_run_chunk, chunk))
+            matches += len(chunk)
+        while pending:
+            output.write(pending.popleft().result())
+    return matches
+
+
+def main() -> None:
+    """
+    Run the pipeline from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', nargs='?', default='-',
+                        help="a JSON lines file of match specs "
+                             "(default: stdin)")
+    parser.add_argument('output', nargs='?', default='-',
+                        help="where to write results (default: stdout)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: play matches in "
+                             "this process)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    input_file = sys.stdin if args.input == '-' else open(args.input)
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    start = time.perf_counter()
+    try:
+        matches = run_pipeline(input_file, output_file, args.workers,
+                               args.chunk_size)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    elapsed = time.perf_counter() - start
+    print("{} matches in {:.2f}s ({:,.0f} matches/s)".format(
+        matches, elapsed, matches / elapsed if elapsed else 0.0),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
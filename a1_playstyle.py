@@ -17,20 +17,25 @@ for only a normal attack, it should return 'A'. If they have enough SP for
 either a normal or a special attack, it should return either 'A' or
 'S') at random.
 """
-from typing import Any
+from typing import Any, Optional
 import random
+from a1_rules import random_playstyle_moves
 # from a1_battle_queue import BattleQueue
 
+# How many random bits a RandomPlaystyle draws from its generator at a time.
+RANDOM_BLOCK_BITS = 64
+
 
 class Playstyle:
     """
     The Playstyle superclass.
 
-    is_manual - Whether the class is a manual Playstyle or not.
+    is_manual - Whether the class is a manual Playstyle or not. It is a
+                class attribute, so it can be read without an instance.
     battle_queue - The BattleQueue corresponding to the game this Playstyle is
                    being used in.
     """
-    is_manual: bool
+    is_manual: bool = True
     battle_queue: 'BattleQueue'
 
     def __init__(self, battle_queue: 'BattleQueue') -> None:
@@ -38,7 +43,6 @@ class Playstyle:
         Initialize this Playstyle with BattleQueue as its battle queue.
         """
         self.battle_queue = battle_queue
-        self.is_manual = True
 
     def select_attack(self, parameter: Any = None) -> str:
         """
@@ -76,13 +80,54 @@ class ManualPlaystyle(Playstyle):
 class RandomPlaystyle(Playstyle):
     """
     The RandomPlaystyle class. Inherits from Playstyle.
+
+    Each RandomPlaystyle has its own random number generator, rng. It is
+    seeded with seed, or from the random module if seed is None (so seeding
+    the random module still makes whole games reproducible).
     """
-    def __init__(self, battle_queue: 'BattleQueue') -> None:
+    is_manual = False
+    rng: random.Random
+
+    def __init__(self, battle_queue: 'BattleQueue',
+                 seed: Optional[int] = None) -> None:
         """
         Initialize Random playstyle. Inherits from the Playstyle class.
         """
         super().__init__(battle_queue)
-        self.is_manual = False
+        self.rng = random.Random(random.getrandbits(64) if seed is None
+                                 else seed)
+        # Random bits drawn from rng ahead of time, used lowest first.
+        self._bits = 0
+        self._bits_left = 0
+
+    def seed(self, value: Any) -> None:
+        """
+        Reseed rng with value and drop any bits already drawn from it, so
+        the moves from here on depend only on value.
+
+        >>> ps = RandomPlaystyle(None)
+        >>> ps.seed(1)
+        >>> first = [ps._random_bit() for _ in range(8)]
+        >>> ps.seed(1)
+        >>> [ps._random_bit() for _ in range(8)] == first
+        True
+        """
+        self.rng.seed(value)
+        self._bits = 0
+        self._bits_left = 0
+
+    def _random_bit(self) -> int:
+        """
+        Return a random bit, drawing a new block of RANDOM_BLOCK_BITS bits
+        from rng when the last one runs out.
+        """
+        if not self._bits_left:
+            self._bits = self.rng.getrandbits(RANDOM_BLOCK_BITS)
+            self._bits_left = RANDOM_BLOCK_BITS
+        bit = self._bits & 1
+        self._bits >>= 1
+        self._bits_left -= 1
+        return bit
 
     def select_attack(self, parameter: Any = None) -> str:
         """
@@ -91,24 +136,108 @@ class RandomPlaystyle(Playstyle):
         If they have enough SP for either a normal or a special attack, it
         should return either 'A' or 'S') at random.
         """
-        moves_list = []
-
-        if not self.battle_queue.is_empty():
-            character = self.battle_queue.peek()
-            if str(character) == "Mage":
-                if character.skill_points >= 10:
-                    moves_list.append("S")
-                if character.skill_points >= 3:
-                    moves_list.append("A")
-            else:
-                if character.skill_points >= 30:
-                    moves_list.append("S")
-                if character.skill_points >= 5:
-                    moves_list .append("A")
-
-        if moves_list != []:
-            return random.choice(moves_list)
-        return "X"   # if valid move cannot be found, return "X"
+        if self.battle_queue.is_empty():
+            return "X"
+        character = self.battle_queue.peek()
+        moves = random_playstyle_moves(type(character),
+                                       character.skill_points)
+        if not moves:
+            return "X"   # if valid move cannot be found, return "X"
+        if len(moves) == 1:
+            return moves[0]
+        if len(moves) == 2:
+            return moves[self._random_bit()]
+        return moves[self.rng.randrange(len(moves))]
+
+
+class OptimalPlaystyle(Playstyle):
+    """
+    The OptimalPlaystyle class. Inherits from Playstyle.
+
+    Picks the move a perfect player would, using the exact solver in
+    a1_solver. Each pairing of classes is solved the first time it is played
+    (well under a second), after which every move is a table lookup.
+    """
+    is_manual = False
+
+    def __init__(self, battle_queue: 'BattleQueue') -> None:
+        """
+        Initialize Optimal playstyle. Inherits from the Playstyle class.
+        """
+        # Only games that use this playstyle pay for importing the solver.
+        from a1_solver import position_of, solver_for
+        super().__init__(battle_queue)
+        self._position_of = position_of
+        self._solver_for = solver_for
+
+    def select_attack(self, parameter: Any = None) -> str:
+        """
+        Return the key of the best move for the next character in this
+        Playstyle's battle_queue, or "X" if they have no move.
+        """
+        if self.battle_queue.is_empty():
+            return "X"
+        character = self.battle_queue.peek()
+        solver = self._solver_for(type(character), type(character.enemy))
+        move = solver.best_move(self._position_of(solver.matchup, character,
+                                                  self.battle_queue))
+        return move if move is not None else "X"
+
+
+class TablebasePlaystyle(Playstyle):
+    """
+    The TablebasePlaystyle class. Inherits from Playstyle.
+
+    Plays the same moves as OptimalPlaystyle, but looks them up in the
+    memory-mapped tablebase at path (a1_tablebase.DEFAULT_PATH if path is
+    None) instead of solving anything, so it costs nothing to start up.
+
+    >>> import os, tempfile
+    >>> from a1_battle_queue import BattleQueue
+    >>> from a1_character_class import Mage, Rogue
+    >>> from a1_simulate import play_battle
+    >>> from a1_tablebase import build
+    >>> path = os.path.join(tempfile.mkdtemp(), 'a1_tablebase.bin')
+    >>> _ = build(path)
+    >>> bq = BattleQueue()
+    >>> p1 = Rogue("Sophia", bq, OptimalPlaystyle(bq))
+    >>> p2 = Mage("Ashas", bq, TablebasePlaystyle(bq, path))
+    >>> p1.enemy, p2.enemy = p2, p1
+    >>> bq.add(p1)
+    >>> bq.add(p2)
+    >>> play_battle(bq, p1)
+    ('p1', 12)
+    """
+    is_manual = False
+    path: str
+
+    def __init__(self, battle_queue: 'BattleQueue',
+                 path: Optional[str] = None) -> None:
+        """
+        Initialize Tablebase playstyle. Inherits from the Playstyle class.
+        """
+        # Only games that use this playstyle pay for importing the tablebase.
+        from a1_solver import position_of
+        from a1_tablebase import DEFAULT_PATH, open_tablebase
+        super().__init__(battle_queue)
+        self.path = DEFAULT_PATH if path is None else path
+        self._position_of = position_of
+        self._open_tablebase = open_tablebase
+
+    def select_attack(self, parameter: Any = None) -> str:
+        """
+        Return the key of the best move for the next character in this
+        Playstyle's battle_queue, or "X" if they have no move or the
+        position isn't in the tablebase.
+        """
+        if self.battle_queue.is_empty():
+            return "X"
+        character = self.battle_queue.peek()
+        classes = (type(character), type(character.enemy))
+        tablebase = self._open_tablebase(self.path)
+        found = tablebase.lookup(*classes, self._position_of(
+            tablebase.matchup(*classes), character, self.battle_queue))
+        return found[1] if found is not None else "X"
 
 
 if __name__ == '__main__':
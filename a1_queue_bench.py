@@ -0,0 +1,118 @@
+"""
+Compare BattleQueue with RunLengthBattleQueue on long random battles.
+
+Normal battles only last a few dozen turns, so the characters here start
+with far more HP and SP than usual, which lets the queue grow to thousands
+of entries. For each kind of queue this reports the peak memory held by the
+queue's entries and the average cost of remove() and peek().
+
+Run it from the command line, e.g.:
+    python a1_queue_bench.py --points 20000 --p1 r --p2 r
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Dict
+
+from a1_battle_queue import BattleQueue, RunLengthBattleQueue
+from a1_game import CHARACTER_CLASSES
+from a1_simulate import set_up_battle
+
+QUEUE_CLASSES = (BattleQueue, RunLengthBattleQueue)
+# How often (in turns) to measure the queue's memory.
+MEMORY_SAMPLE_TURNS = 50
+
+
+def queue_bytes(battle_queue: BattleQueue) -> int:
+    """
+    Return the bytes taken up by the containers and entries of battle_queue
+    (not counting the characters themselves).
+    """
+    total = 0
+    for container in (battle_queue._queue_content, battle_queue._parked):
+        total += sys.getsizeof(container)
+        for entry in container:
+            total += sys.getsizeof(entry) + sys.getsizeof(entry[0])
+    return total
+
+
+def long_battle(queue_class: type, points: int, p1_class: str = 'r',
+                p2_class: str = 'r', seed: int = 0) -> Dict[str, float]:
+    """
+    Play a random battle between characters starting with points HP and SP
+    in a queue_class queue, and return its length, the queue's peak length
+    and memory, and the average time of remove() and peek() in microseconds.
+
+    >>> plain = long_battle(BattleQueue, 500)
+    >>> runs = long_battle(RunLengthBattleQueue, 500)
+    >>> plain['turns'] == runs['turns']
+    True
+    >>> runs['peak_entries'] < plain['peak_entries']
+    True
+    """
+    random.seed(seed)
+    battle_queue, p1, p2 = set_up_battle(p1_class, p2_class,
+                                         queue_class=queue_class)
+    for character in (p1, p2):
+        character.health_points = points
+        character.skill_points = points
+
+    turns = 0
+    peak_entries = peak_bytes = 0
+    remove_time = peek_time = 0
+    clock = time.perf_counter_ns
+    while not battle_queue.is_over():
+        start = clock()
+        character = battle_queue.peek()
+        peek_time += clock() - start
+
+        move = character.playstyle.select_attack()
+        if not character.is_valid_action(move):
+            break
+        if move == 'A':
+            character.attack()
+        else:
+            character.special_attack()
+        if character.get_available_actions() != []:
+            start = clock()
+            battle_queue.remove()
+            remove_time += clock() - start
+
+        turns += 1
+        peak_entries = max(peak_entries, len(battle_queue._queue_content) +
+                           len(battle_queue._parked))
+        if turns % MEMORY_SAMPLE_TURNS == 0:
+            peak_bytes = max(peak_bytes, queue_bytes(battle_queue))
+    peak_bytes = max(peak_bytes, queue_bytes(battle_queue))
+
+    return {'turns': turns, 'peak_entries': peak_entries,
+            'peak_bytes': peak_bytes,
+            'remove_us': remove_time / max(turns, 1) / 1000,
+            'peek_us': peek_time / max(turns, 1) / 1000}
+
+
+def main() -> None:
+    """
+    Run the comparison from the command line and print a table.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--points', type=int, default=20000,
+                        help="starting HP and SP of both characters")
+    parser.add_argument('--p1', default='r', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--p2', default='r', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("{:<22} {:>7} {:>8} {:>11} {:>10} {:>9}".format(
+        "queue", "turns", "entries", "peak bytes", "remove us", "peek us"))
+    for queue_class in QUEUE_CLASSES:
+        result = long_battle(queue_class, args.points, args.p1, args.p2,
+                             args.seed)
+        print("{:<22} {:>7} {:>8} {:>11} {:>10.3f} {:>9.3f}".format(
+            queue_class.__name__, result['turns'], result['peak_entries'],
+            result['peak_bytes'], result['remove_us'], result['peek_us']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Dirty-rectangle rendering for the A1 UI.
+
+Most of the A1 window stays the same from one frame to the next, so instead
+of redrawing the whole screen and flipping it every frame, DirtyRectRenderer
+remembers what it drew in each region last frame, redraws only the regions
+whose contents changed, and pushes just those to the display with
+pygame.display.update.
+
+Run this file to compare the frame time of dirty-rectangle rendering with a
+full redraw on a headless display.
+"""
+import os
+import time
+from typing import Hashable, List, Tuple
+
+import pygame
+
+from a1_trace import TRACE
+
+# One thing to draw: (layer name, content key, surface, top-left position).
+# The content key identifies what is drawn (e.g. a sprite name or a line of
+# text); a layer is redrawn when its key or position changes. Layers are
+# drawn in the order given, so later layers go on top.
+Layer = Tuple[str, Hashable, pygame.Surface, Tuple[int, int]]
+
+
+class DirtyRectRenderer:
+    """
+    Draws frames made of layers onto screen, redrawing and updating only the
+    parts of the screen that changed since the previous frame.
+
+    If full_redraw is True, every frame is redrawn and flipped in full
+    instead, the way a1_ui used to draw.
+    """
+
+    def __init__(self, screen: pygame.Surface,
+                 background_color: Tuple[int, int, int] = (255, 255, 255),
+                 full_redraw: bool = False) -> None:
+        """
+        Initialize a renderer for screen, cleared to background_color
+        underneath every layer.
+        """
+        self.screen = screen
+        self.background_color = background_color
+        self.full_redraw = full_redraw
+        self._previous = None
+
+    def invalidate(self) -> None:
+        """
+        Make the next frame redraw the whole screen.
+        """
+        self._previous = None
+
+    def draw(self, layers: List[Layer]) -> List[pygame.Rect]:
+        """
+        Draw the frame made of layers and return the rectangles of the
+        screen that were updated.
+        """
+        current = {name: (key, pygame.Rect(position, surface.get_size()))
+                   for name, key, surface, position in layers}
+        if self.full_redraw or self._previous is None:
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty = self._changed_rects(self._previous, current)
+        self._previous = current
+
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.screen.fill(self.background_color)
+            for name, _, surface, position in layers:
+                if rect.colliderect(current[name][1]):
+                    self.screen.blit(surface, position)
+        self.screen.set_clip(None)
+
+        with TRACE.span('display_update'):
+            if self.full_redraw:
+                pygame.display.flip()
+            elif dirty:
+                pygame.display.update(dirty)
+        return dirty
+
+    @staticmethod
+    def _changed_rects(previous: dict, current: dict) -> List[pygame.Rect]:
+        """
+        Return the rectangles covered by layers that differ between the
+        previous and current frames, where they were and where they are.
+        Overlapping rectangles are merged, so no pixel is drawn twice.
+        """
+        dirty = []
+        for name in set(previous) | set(current):
+            before = previous.get(name)
+            after = current.get(name)
+            if before == after:
+                continue
+            for drawn in (before, after):
+                if drawn is None:
+                    continue
+                rect = drawn[1]
+                overlapping = rect.collidelist(dirty)
+                while overlapping != -1:
+                    rect = rect.union(dirty.pop(overlapping))
+                    overlapping = rect.collidelist(dirty)
+                dirty.append(rect)
+        return dirty
+
+
+def compare_frame_times(frames: int = 2000) -> Tuple[float, float]:
+    """
+    Return the average milliseconds per frame of a1_ui.update_game with a
+    full redraw and with dirty-rectangle rendering, playing the same seeded
+    random battle in both.
+    """
+    import random
+    import a1_game
+    import a1_ui
+    from a1_simulate import set_up_battle
+
+    results = []
+    for full_redraw in (True, False):
+        random.seed(0)
+        a1_game.BATTLE_QUEUE, a1_game.P1, a1_game.P2 = set_up_battle('r', 'm')
+        a1_game.GAME_IS_OVER = False
+        a1_game.GAME_WINNER = None
+        a1_ui.create_window()
+        a1_ui.RENDERER.full_redraw = full_redraw
+        start = time.perf_counter()
+        for frame in range(frames):
+            if frame % a1_ui.RANDOM_TIMER == 0 and not a1_game.GAME_IS_OVER:
+                a1_game.perform_attack()
+            a1_ui.update_game()
+        results.append((time.perf_counter() - start) / frames * 1000)
+    return results[0], results[1]
+
+
+def main() -> None:
+    """
+    Print the frame time comparison on a headless display.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    full, dirty = compare_frame_times()
+    print("Full redraw: {:.3f} ms/frame".format(full))
+    print("Dirty rects: {:.3f} ms/frame ({:.1f}x)".format(dirty, full / dirty))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+"""
+Binary replay logs for A1 battles.
+
+A replay log is a stream of fixed-width records, one per turn, so a battle
+can be checked or replayed long after it was played. ReplayWriter buffers
+records and writes them out in large blocks. ReplayReader memory-maps a log
+and reads battles straight out of it, one at a time or by battle id, without
+loading the whole file.
+
+File layout (all little-endian):
+    header  - magic b'A1RP', format version, record size (4sHH)
+    records - (battle id, turn, actor, move, p1 HP, p1 SP, p2 HP, p2 SP)
+              (IHcc4B), in battle id order. A battle starts with a turn 0
+              record, whose actor and move hold the a1_game.CHARACTER_CLASSES
+              keys of p1 and p2 and whose HP and SP are their starting values.
+              Every later record has actor b'1' or b'2', the move made and
+              everyone's HP and SP after it.
+
+Run it from the command line to record random battles and verify them, e.g.:
+    python a1_replay.py 100000 replays.bin --seed 1
+"""
+import argparse
+import mmap
+import random
+import struct
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from a1_game import CHARACTER_CLASSES
+from a1_rules import STARTING_HP, STARTING_SP
+from a1_simulate import play_battle, set_up_battle
+from a1_solver import Matchup
+
+MAGIC = b'A1RP'
+VERSION = 1
+# Records are buffered until there are this many bytes of them.
+DEFAULT_BUFFER_SIZE = 1 << 16
+# ReplayReader.records copies this many records at a time out of the log.
+READ_BLOCK_RECORDS = 4096
+
+_HEADER = struct.Struct('<4sHH')
+_RECORD = struct.Struct('<IHcc4B')
+_ACTORS = (b'1', b'2')
+_MOVES = (b'A', b'S')
+_STARTING_POINTS = (STARTING_HP, STARTING_SP, STARTING_HP, STARTING_SP)
+
+
+class Record(NamedTuple):
+    """
+    One record of a replay log (see the module docstring).
+    """
+    battle: int
+    turn: int
+    actor: bytes
+    move: bytes
+    p1_hp: int
+    p1_sp: int
+    p2_hp: int
+    p2_sp: int
+
+
+class ReplayWriter:
+    """
+    Streams battles to a replay log at path, holding up to buffer_size bytes
+    of records in memory between writes.
+
+    Battles must be written in increasing battle id order, and every record
+    of a battle must be written before the next battle starts.
+    """
+    path: str
+
+    def __init__(self, path: str,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        Create the replay log at path and write its header.
+        """
+        self.path = path
+        self._buffer_size = buffer_size
+        self._buffer = bytearray(_HEADER.pack(MAGIC, VERSION, _RECORD.size))
+        self._file = open(path, 'wb')
+        self._battle = -1
+        self._turn = 0
+
+    def start_battle(self, battle: int, p1: 'Character') -> None:
+        """
+        Start recording battle number battle, between p1 and p1's enemy.
+        """
+        if battle <= self._battle:
+            raise ValueError("Battle ids must increase.")
+        self._battle = battle
+        self._turn = 0
+        keys = {character_class: key.encode()
+                for key, character_class in CHARACTER_CLASSES.items()}
+        self._append(keys[type(p1)], keys[type(p1.enemy)], p1)
+
+    def record_turn(self, p1: 'Character', character: 'Character',
+                    move: str) -> None:
+        """
+        Record that character made move in the current battle, where p1 is
+        the battle's first character.
+        """
+        self._turn += 1
+        self._append(_ACTORS[character is not p1], move.encode(), p1)
+
+    def _append(self, actor: bytes, move: bytes, p1: 'Character') -> None:
+        """
+        Add a record for the current battle and turn to the buffer, writing
+        the buffer out once it's full.
+        """
+        p2 = p1.enemy
+        self._buffer += _RECORD.pack(self._battle, self._turn, actor, move,
+                                     p1.get_hp(), p1.get_sp(), p2.get_hp(),
+                                     p2.get_sp())
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write out every buffered record.
+        """
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> None:
+        """
+        Write out every buffered record and close the log.
+        """
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> 'ReplayWriter':
+        """
+        Return this ReplayWriter, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Close this ReplayWriter at the end of a with statement.
+        """
+        self.close()
+
+
+class ReplayReader:
+    """
+    A read-only, memory-mapped replay log.
+    """
+    path: str
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the replay log at path.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = _HEADER.unpack_from(self._map)
+        if (magic != MAGIC or version != VERSION or
+                record_size != _RECORD.size):
+            self._map.close()
+            raise ValueError("{} is not a version {} replay log.".format(
+                path, VERSION))
+        self._count = (len(self._map) - _HEADER.size) // _RECORD.size
+
+    def __len__(self) -> int:
+        """
+        Return the number of records in this log.
+        """
+        return self._count
+
+    def __getitem__(self, index: int) -> Record:
+        """
+        Return record number index of this log.
+        """
+        return Record._make(_RECORD.unpack_from(
+            self._map, _HEADER.size + index * _RECORD.size))
+
+    def records(self) -> Iterator[Record]:
+        """
+        Yield every record in this log, in order.
+
+        Records are copied out of the log a block at a time, so the log can
+        be closed while this is still being iterated over.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'replays.bin')
+        >>> record_battles(path, 3, 'r', 'm', seed=0)
+        >>> reader = ReplayReader(path)
+        >>> records = reader.records()
+        >>> next(records).turn
+        0
+        >>> reader.close()
+        >>> next(records).turn
+        1
+        """
+        for first in range(0, self._count, READ_BLOCK_RECORDS):
+            start = _HEADER.size + first * _RECORD.size
+            end = start + min(READ_BLOCK_RECORDS,
+                              self._count - first) * _RECORD.size
+            yield from map(Record._make,
+                           _RECORD.iter_unpack(self._map[start:end]))
+
+    def battles(self) -> Iterator[List[Record]]:
+        """
+        Yield the records of each battle in this log, in order.
+        """
+        battle = []
+        for record in self.records():
+            if record.turn == 0 and battle:
+                yield battle
+                battle = []
+            battle.append(record)
+        if battle:
+            yield battle
+
+    def battle(self, battle: int) -> List[Record]:
+        """
+        Return the records of battle number battle, found by binary search,
+        or [] if it isn't in this log.
+        """
+        index = bisect_left(_BattleIds(self), battle)
+        records = []
+        while index < self._count:
+            record = self[index]
+            if record.battle != battle:
+                break
+            records.append(record)
+            index += 1
+        return records
+
+    def close(self) -> None:
+        """
+        Unmap this log's file.
+        """
+        self._map.close()
+
+
+class _BattleIds:
+    """
+    The battle id of every record of a ReplayReader, as a sequence for
+    bisect.
+    """
+
+    def __init__(self, reader: ReplayReader) -> None:
+        """
+        Initialize the battle ids of reader's records.
+        """
+        self._reader = reader
+
+    def __len__(self) -> int:
+        """
+        Return the number of records.
+        """
+        return len(self._reader)
+
+    def __getitem__(self, index: int) -> int:
+        """
+        Return the battle id of record number index.
+        """
+        return _RECORD.unpack_from(self._reader._map,
+                                   _HEADER.size + index * _RECORD.size)[0]
+
+
+class Verifier:
+    """
+    Checks recorded battles against the Rogue and Mage rules, remembering
+    the positions it has worked out so repeated lines of play are checked
+    with dict lookups.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize a Verifier with nothing worked out yet.
+        """
+        # The character classes, by their keys as they appear in records.
+        self._classes = {key.encode(): character_class
+                         for key, character_class in CHARACTER_CLASSES.items()}
+        self._matchups: Dict[Tuple[bytes, bytes], Matchup] = {}
+        # (matchup, position, move) -> (position after, p1 and p2 HP and SP
+        # after, the actor)
+        self._moves: Dict[tuple, tuple] = {}
+
+    def verify(self, records: List[Record]) -> Optional[str]:
+        """
+        Return why the battle recorded in records breaks the rules, or None
+        if it doesn't.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'replays.bin')
+        >>> record_battles(path, 3, 'r', 'm', seed=0)
+        >>> reader = ReplayReader(path)
+        >>> records = reader.battle(1)
+        >>> Verifier().verify(records) is None
+        True
+        >>> Verifier().verify(records[:-1])
+        'battle 1: ends after turn 13, before it is over'
+        >>> Verifier().verify(records[:1] + records[2:])
+        'battle 1: turn 1 is numbered 2'
+        >>> Verifier().verify([])
+        'no records'
+        >>> Verifier().verify([records[0]._replace(p1_sp=50)] + records[1:])
+        'battle 1: starts with HP and SP (100, 50, 100, 100)'
+        >>> Verifier().verify(records[:2] + [records[2]._replace(battle=2)])
+        'battle 1: turn 2 is from battle 2'
+        >>> corrupt = records[2]._replace(move=b'\\xff')
+        >>> Verifier().verify(records[:2] + [corrupt])
+        'battle 1, turn 2: unknown move 0xff'
+        >>> records[1] = records[1]._replace(p2_hp=1)
+        >>> Verifier().verify(records)
+        'battle 1, turn 1: HP and SP should be (100, 90, 88, 100)'
+        >>> reader.close()
+        """
+        if not records:
+            return "no records"
+        start = records[0]
+        key = (start.actor, start.move)
+        if start.turn != 0 or key[0] not in self._classes or \
+                key[1] not in self._classes:
+            return "battle {}: no start record".format(start.battle)
+        if tuple(start[4:]) != _STARTING_POINTS:
+            return "battle {}: starts with HP and SP {}".format(
+                start.battle, tuple(start[4:]))
+        if key not in self._matchups:
+            self._matchups[key] = Matchup(self._classes[key[0]],
+                                          self._classes[key[1]])
+        matchup = self._matchups[key]
+        position = matchup.start()
+
+        for turn, record in enumerate(records[1:], 1):
+            if record.battle != start.battle:
+                return "battle {}: turn {} is from battle {}".format(
+                    start.battle, turn, record.battle)
+            if record.turn != turn:
+                return "battle {}: turn {} is numbered {}".format(
+                    record.battle, turn, record.turn)
+            if record.actor not in _ACTORS:
+                return "battle {}, turn {}: unknown actor 0x{}".format(
+                    record.battle, record.turn, record.actor.hex())
+            if record.move not in _MOVES:
+                return "battle {}, turn {}: unknown move 0x{}".format(
+                    record.battle, record.turn, record.move.hex())
+            move = (key, position, record.move)
+            if move not in self._moves:
+                if record.move.decode() not in matchup.moves(position):
+                    return "battle {}, turn {}: {} can't move {}".format(
+                        record.battle, record.turn, record.actor.decode(),
+                        record.move.decode())
+                after = matchup.play(position, record.move.decode())
+                self._moves[move] = (after, tuple(matchup.decode(after)[:4]),
+                                     _ACTORS[matchup.mover(position)])
+            position, points, actor = self._moves[move]
+            if record.actor != actor:
+                return "battle {}, turn {}: it's player {}'s turn".format(
+                    record.battle, record.turn, actor.decode())
+            if tuple(record[4:]) != points:
+                return "battle {}, turn {}: HP and SP should be {}".format(
+                    record.battle, record.turn, points)
+        if matchup.mover(position) is not None:
+            return "battle {}: ends after turn {}, before it is over".format(
+                start.battle, len(records) - 1)
+        return None
+
+
+def record_battles(path: str, battles: int, p1_class: str = 'r',
+                   p2_class: str = 'm', p1_playstyle: str = 'r',
+                   p2_playstyle: str = 'r', seed: Optional[int] = None
+                   ) -> None:
+    """
+    Play battles battles like a1_simulate.run_battles does and write them to
+    a replay log at path.
+    """
+    if seed is not None:
+        random.seed(seed)
+    with ReplayWriter(path) as writer:
+        for battle in range(battles):
+            battle_queue, p1, _ = set_up_battle(p1_class, p2_class,
+                                                p1_playstyle, p2_playstyle)
+            writer.start_battle(battle, p1)
+            play_battle(battle_queue, p1, lambda character, move:
+                        writer.record_turn(p1, character, move))
+
+
+def main() -> None:
+    """
+    Record battles from the command line, then read them back and verify
+    them.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('battles', type=int, nargs='?', default=10000)
+    parser.add_argument('path', nargs='?', default='replays.bin')
+    parser.add_argument('--p1', default='r', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--p2', default='m', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    record_battles(args.path, args.battles, args.p1, args.p2, seed=args.seed)
+    print("Recorded {} battles in {:.2f}s".format(
+        args.battles, time.perf_counter() - start))
+
+    reader = ReplayReader(args.path)
+    verifier = Verifier()
+    start = time.perf_counter()
+    verified = 0
+    for records in reader.battles():
+        problem = verifier.verify(records)
+        if problem is not None:
+            print(problem)
+        verified += 1
+    elapsed = time.perf_counter() - start
+    print("Verified {} battles ({} records) in {:.2f}s ({:,.0f} battles/s)"
+          .format(verified, len(reader), elapsed, verified / elapsed))
+    reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+The combat rules of the A1 character classes as plain data.
+
+Rogue and Mage hard-code their numbers inside their attack methods, which is
+fine for playing a game but not for tools that reason about many battles at
+once (the vectorized simulator, solvers, replay verification). Those tools
+read the numbers from RULES instead. The doctests below check that RULES
+agrees with what the character classes actually do.
+"""
+from typing import NamedTuple, Tuple
+
+from a1_character_class import Mage, Rogue
+
+# Where the entries a move adds to the battle queue go: SELF adds the
+# character that made the move, ENEMY adds its enemy.
+SELF = 0
+ENEMY = 1
+
+# Every character starts a battle with this many HP and SP.
+STARTING_HP = 100
+STARTING_SP = 100
+
+
+class ClassRules(NamedTuple):
+    """
+    The numbers behind one character class.
+
+    defence - Subtracted from the damage of every attack this class takes.
+    attack_cost, special_cost - SP taken by a normal/special attack.
+    attack_damage, special_damage - Damage dealt before the enemy's defence.
+    attack_adds, special_adds - Who each move adds to the end of the battle
+                                queue, in order (SELF or ENEMY).
+    """
+    defence: int
+    attack_cost: int
+    attack_damage: int
+    attack_adds: Tuple[int, ...]
+    special_cost: int
+    special_damage: int
+    special_adds: Tuple[int, ...]
+
+    def min_cost(self) -> int:
+        """
+        Return the least SP this class needs to have any available action.
+
+        >>> RULES[Rogue].min_cost()
+        3
+        """
+        return min(self.attack_cost, self.special_cost)
+
+    def cost(self, move: str) -> int:
+        """
+        Return the SP cost of move ('A' or 'S').
+
+        >>> RULES[Mage].cost('S')
+        30
+        """
+        return self.special_cost if move == 'S' else self.attack_cost
+
+    def damage(self, move: str) -> int:
+        """
+        Return the damage move ('A' or 'S') deals before the enemy's defence.
+
+        >>> RULES[Mage].damage('A')
+        20
+        """
+        return self.special_damage if move == 'S' else self.attack_damage
+
+    def adds(self, move: str) -> Tuple[int, ...]:
+        """
+        Return who move ('A' or 'S') adds to the end of the battle queue.
+
+        >>> RULES[Rogue].adds('S')
+        (0, 0)
+        """
+        return self.special_adds if move == 'S' else self.attack_adds
+
+    def available_actions(self, skill_points: int) -> Tuple[str, ...]:
+        """
+        Return the actions a character of this class with skill_points SP
+        can make, in the same order as get_available_actions.
+
+        >>> RULES[Mage].available_actions(29)
+        ('A',)
+        """
+        actions = ()
+        if skill_points >= self.special_cost:
+            actions += ('S',)
+        if skill_points >= self.attack_cost:
+            actions += ('A',)
+        return actions
+
+
+RULES = {
+    Rogue: ClassRules(defence=10,
+                      attack_cost=3, attack_damage=15, attack_adds=(SELF,),
+                      special_cost=10, special_damage=20,
+                      special_adds=(SELF, SELF)),
+    Mage: ClassRules(defence=8,
+                     attack_cost=5, attack_damage=20, attack_adds=(SELF,),
+                     special_cost=30, special_damage=40,
+                     special_adds=(ENEMY, SELF)),
+}
+
+
+def hit(hp: int, damage: int, defence: int) -> int:
+    """
+    Return the HP left after a character with hp HP and defence defence
+    takes an attack dealing damage damage. HP never drops below 0.
+
+    >>> hit(100, 15, 8)
+    93
+    >>> hit(3, 40, 10)
+    0
+    """
+    return max(hp - (damage - defence), 0)
+
+
+# MOVE_TABLES[character_class][sp] is the moves a character_class character
+# with sp SP can make, for every SP a character can have during a battle.
+MOVE_TABLES = {
+    character_class: tuple(rules.available_actions(sp)
+                           for sp in range(STARTING_SP + 1))
+    for character_class, rules in RULES.items()
+}
+
+
+def random_playstyle_moves(character_class: type,
+                           skill_points: int) -> Tuple[str, ...]:
+    """
+    Return the moves RandomPlaystyle.select_attack picks from (uniformly) for
+    a character_class character with skill_points SP: every move they can
+    make.
+
+    >>> random_playstyle_moves(Rogue, 10)
+    ('S', 'A')
+    >>> random_playstyle_moves(Mage, 10)
+    ('A',)
+    >>> random_playstyle_moves(Rogue, 2)
+    ()
+    """
+    table = MOVE_TABLES[character_class]
+    if 0 <= skill_points < len(table):
+        return table[skill_points]
+    return RULES[character_class].available_actions(skill_points)
+
+
+def _check_rules(character_class: type, move: str) -> bool:
+    """
+    Return whether RULES[character_class] describes what move does to a
+    fresh character of character_class fighting one of each class.
+
+    >>> all(_check_rules(c, m) for c in RULES for m in 'AS')
+    True
+    """
+    from a1_battle_queue import BattleQueue
+    from a1_playstyle import ManualPlaystyle
+
+    rules = RULES[character_class]
+    for enemy_class in RULES:
+        bq = BattleQueue()
+        ps = ManualPlaystyle(bq)
+        character = character_class('c', bq, ps)
+        enemy = enemy_class('e', bq, ps)
+        character.enemy = enemy
+        enemy.enemy = character
+        if move == 'A':
+            character.attack()
+        else:
+            character.special_attack()
+        expected_queue = [(character, enemy)[who] for who in rules.adds(move)]
+        queued = []
+        while not bq.is_empty():
+            queued.append(bq.remove())
+        if (character.get_sp() != STARTING_SP - rules.cost(move) or
+                enemy.get_hp() != hit(STARTING_HP, rules.damage(move),
+                                      RULES[enemy_class].defence) or
+                queued != expected_queue or
+                tuple(character.get_available_actions()) !=
+                rules.available_actions(character.get_sp())):
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,363 @@
+"""
+An asyncio battle server for A1.
+
+One server process hosts any number of independent battles. Clients connect
+over TCP or a Unix socket and talk in JSON lines: every request is one JSON
+object on its own line, and so is every response. The requests are:
+
+    {"op": "new", "p1": "r", "p2": "m", "p1_playstyle": "m",
+     "p2_playstyle": "r", "seed": 1}
+        Start a battle (classes and playstyles are keys of
+        a1_game.CHARACTER_CLASSES and PLAYSTYLE_CLASSES; every field is
+        optional, and seed seeds the random playstyles).
+    {"op": "move", "match": 3, "move": "A"}
+        Make a move for the manual player whose turn it is.
+    {"op": "state", "match": 3}
+        Just get the battle's state.
+    {"op": "close", "match": 3}
+        Forget the battle.
+
+Automatic players move on the server as soon as it's their turn, so every
+response describes a battle that is over or waiting for a manual player:
+    {"match": 3, "turn": 1 or 2 (whose move it is, or null), "moves": the
+     moves they can make, "p1": [HP, SP], "p2": [HP, SP], "over": true/false,
+     "winner": 1, 2 or null, "stalled": true/false}
+A request that can't be carried out gets {"error": "..."} instead. A line
+too long to be a request gets an error and closes the connection. Battles
+belong to the connection that started them and are dropped when it closes.
+
+Run it from the command line to serve, e.g.:
+    python a1_server.py serve --port 8765
+or to measure latency and throughput with the load generator, which starts a
+server in the same process and drives games through it over loopback:
+    python a1_server.py bench --games 10000 --connections 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional, Set
+
+from a1_game import CHARACTER_CLASSES, PLAYSTYLE_CLASSES
+from a1_simulate import seed_playstyles, set_up_battle
+from a1_solver import solver_for
+from a1_trace import percentile
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class Match:
+    """
+    One battle hosted by a BattleServer.
+
+    stalled - Whether an automatic player picked a move they can't make,
+              which ends the battle with no winner.
+    """
+    stalled: bool
+
+    def __init__(self, match_id: int, p1_class: str, p2_class: str,
+                 p1_playstyle: str, p2_playstyle: str,
+                 seed: Optional[int]) -> None:
+        """
+        Initialize a new battle between a p1_class and a p2_class character
+        with the given playstyles, and play any automatic moves.
+        """
+        self.match_id = match_id
+        self.battle_queue, self.p1, self.p2 = set_up_battle(
+            p1_class, p2_class, p1_playstyle, p2_playstyle)
+        if seed is not None:
+            seed_playstyles(self.p1, self.p2, seed)
+        self.stalled = False
+        self.play_automatic_moves()
+
+    def is_over(self) -> bool:
+        """
+        Return whether this battle is over.
+        """
+        return self.stalled or self.battle_queue.is_over()
+
+    def _play(self, character: 'Character', move: str) -> bool:
+        """
+        Make character play move, the way a1_game.perform_attack does, and
+        return whether it was a valid move.
+        """
+        if not character.is_valid_action(move):
+            return False
+        if move == 'A':
+            character.attack()
+        else:
+            character.special_attack()
+        if character.get_available_actions() != []:
+            self.battle_queue.remove()
+        return True
+
+    def play_automatic_moves(self) -> None:
+        """
+        Play moves for automatic players until the battle is over or it is a
+        manual player's turn.
+        """
+        while not self.is_over():
+            character = self.battle_queue.peek()
+            if character.playstyle.is_manual:
+                return
+            if not self._play(character,
+                              character.playstyle.select_attack()):
+                self.stalled = True
+
+    def play_manual_move(self, move: str) -> Optional[str]:
+        """
+        Make move for the manual player whose turn it is and play any
+        automatic moves after it. Return why that couldn't be done, or None
+        if it was.
+        """
+        if self.is_over():
+            return "the battle is over"
+        character = self.battle_queue.peek()
+        if not character.playstyle.is_manual:
+            return "it's not a manual player's turn"
+        if not self._play(character, character.playstyle.select_attack(move)):
+            return "{} can't be played now".format(move)
+        self.play_automatic_moves()
+        return None
+
+    def state(self) -> dict:
+        """
+        Return this battle's state as a response.
+        """
+        over = self.is_over()
+        winner = None if self.stalled else self.battle_queue.get_winner()
+        turn = moves = None
+        if not over:
+            character = self.battle_queue.peek()
+            turn = 1 if character is self.p1 else 2
+            moves = character.get_available_actions()
+        return {'match': self.match_id, 'turn': turn, 'moves': moves,
+                'p1': [self.p1.get_hp(), self.p1.get_sp()],
+                'p2': [self.p2.get_hp(), self.p2.get_sp()],
+                'over': over,
+                'winner': None if winner is None else
+                          (1 if winner is self.p1 else 2),
+                'stalled': self.stalled}
+
+
+class BattleServer:
+    """
+    Hosts Matches for any number of client connections.
+    """
+    matches: Dict[int, Match]
+
+    def __init__(self) -> None:
+        """
+        Initialize a BattleServer with no matches.
+        """
+        self.matches = {}
+        self._next_id = 0
+
+    def handle(self, request: dict, owned: Set[int]) -> dict:
+        """
+        Carry out request for a connection that owns the matches in owned,
+        and return the response.
+        """
+        op = request.get('op')
+        if op == 'new':
+            try:
+                keys = [request.get(field, default) for field, default in (
+                    ('p1', 'r'), ('p2', 'm'), ('p1_playstyle', 'm'),
+                    ('p2_playstyle', 'r'))]
+                if keys[0] not in CHARACTER_CLASSES or \
+                        keys[1] not in CHARACTER_CLASSES or \
+                        keys[2] not in PLAYSTYLE_CLASSES or \
+                        keys[3] not in PLAYSTYLE_CLASSES:
+                    return {'error': "unknown class or playstyle"}
+                match = Match(self._next_id, *keys, request.get('seed'))
+            except (TypeError, ValueError) as error:
+                return {'error': str(error)}
+            self._next_id += 1
+            self.matches[match.match_id] = match
+            owned.add(match.match_id)
+            return match.state()
+
+        match_id = request.get('match')
+        if not isinstance(match_id, int) or match_id not in owned:
+            return {'error': "no such match"}
+        match = self.matches[match_id]
+        if op == 'move':
+            problem = match.play_manual_move(request.get('move'))
+            if problem is not None:
+                return {'error': problem, 'match': match_id}
+            return match.state()
+        if op == 'state':
+            return match.state()
+        if op == 'close':
+            owned.discard(match_id)
+            del self.matches[match_id]
+            return {'match': match_id, 'closed': True}
+        return {'error': "unknown op"}
+
+    async def serve_client(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+        """
+        Answer requests from one client until it disconnects, then drop its
+        matches.
+        """
+        owned = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line is longer than the stream's limit.
+                    writer.write(json.dumps(
+                        {'error': "request too long"}).encode() + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    response = {'error': "requests must be JSON objects"}
+                else:
+                    response = self.handle(request, owned)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for match_id in owned:
+                del self.matches[match_id]
+            writer.close()
+
+
+def _warm_solvers() -> None:
+    """
+    Solve every pairing of classes from both start positions, so optimal
+    players never solve anything while the server is handling a request.
+    """
+    classes = list(CHARACTER_CLASSES.values())
+    for p1_class in classes:
+        for p2_class in classes:
+            solver = solver_for(p1_class, p2_class)
+            for first in (0, 1):
+                solver.value(solver.matchup.start(first))
+
+
+async def start_server(server: BattleServer, host: str = DEFAULT_HOST,
+                       port: int = DEFAULT_PORT,
+                       unix_path: Optional[str] = None
+                       ) -> asyncio.AbstractServer:
+    """
+    Start serving server's battles on the Unix socket at unix_path, or on
+    host and port if unix_path is None, once the solvers are warmed up (off
+    the event loop).
+    """
+    await asyncio.get_running_loop().run_in_executor(None, _warm_solvers)
+    if unix_path is not None:
+        return await asyncio.start_unix_server(server.serve_client,
+                                               unix_path)
+    return await asyncio.start_server(server.serve_client, host, port)
+
+
+async def _drive_games(games: int, seed: int, latencies: List[float],
+                       host: str, port: int, unix_path: Optional[str]
+                       ) -> int:
+    """
+    Play games games of a manual Rogue against a random Mage over one
+    connection, all at once: each round sends one move for every unfinished
+    game and then reads all the responses. Record each response's latency in
+    latencies and return the number of requests made.
+    """
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+    requests = [{'op': 'new', 'p1': 'r', 'p2': 'm', 'p1_playstyle': 'm',
+                 'p2_playstyle': 'r', 'seed': seed * games + game}
+                for game in range(games)]
+    sent = 0
+    while requests:
+        writer.write(b''.join(json.dumps(request).encode() + b'\n'
+                              for request in requests))
+        start = time.perf_counter()
+        sent += len(requests)
+        states = []
+        for _ in requests:
+            states.append(json.loads(await reader.readline()))
+            latencies.append(time.perf_counter() - start)
+        requests = [{'op': 'move', 'match': state['match'],
+                     'move': rng.choice(state['moves'])}
+                    for state in states if not state['over']]
+    writer.close()
+    return sent
+
+
+async def run_load(games: int, connections: int,
+                   host: str = DEFAULT_HOST, port: int = 0,
+                   unix_path: Optional[str] = None) -> dict:
+    """
+    Start a BattleServer in this process and play games concurrent games
+    through it, spread over connections connections. Return the number of
+    requests, the seconds taken, requests per second and the p50/p99
+    latency in milliseconds.
+    """
+    server = await start_server(BattleServer(), host, port, unix_path)
+    if unix_path is None:
+        port = server.sockets[0].getsockname()[1]
+    latencies = []
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(
+        _drive_games(games // connections + (i < games % connections), i,
+                     latencies, host, port, unix_path)
+        for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+
+    latencies.sort()
+    requests = sum(counts)
+    return {'games': games, 'requests': requests, 'seconds': elapsed,
+            'requests_per_second': requests / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000}
+
+
+def main() -> None:
+    """
+    Serve battles, or run the load generator, from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('command', choices=('serve', 'bench'))
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None,
+                        help="serve on this Unix socket instead of TCP")
+    parser.add_argument('--games', type=int, default=10000,
+                        help="concurrent games for bench")
+    parser.add_argument('--connections', type=int, default=100,
+                        help="client connections for bench")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        async def serve() -> None:
+            server = await start_server(BattleServer(), args.host, args.port,
+                                        args.unix)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(serve())
+        return
+
+    result = asyncio.run(run_load(args.games, args.connections, args.host,
+                                  0, args.unix))
+    print("{games} games, {requests} requests in {seconds:.2f}s "
+          "({requests_per_second:,.0f} requests/s)".format(**result))
+    print("Latency: p50 {p50_ms:.2f} ms, p99 {p99_ms:.2f} ms".format(
+        **result))
+
+
+if __name__ == '__main__':
+    main()
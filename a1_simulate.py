@@ -0,0 +1,201 @@
+"""
+A headless battle simulator for A1.
+
+This runs battles between characters built straight from
+a1_game.CHARACTER_CLASSES and a1_game.PLAYSTYLE_CLASSES, without pygame,
+a1_ui or the module globals in a1_game. Each turn does the same work as
+a1_game.perform_attack and nothing else, so it is suitable for running
+large numbers of AI vs AI battles for balance checks.
+
+Run it from the command line, e.g.:
+    python a1_simulate.py 100000 --p1 r --p2 m --seed 1
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from a1_battle_queue import BattleQueue
+from a1_game import CHARACTER_CLASSES, PLAYSTYLE_CLASSES, GameSession
+
+# The possible outcomes of a simulated battle.
+P1_WIN = 'p1'
+P2_WIN = 'p2'
+TIE = 'tie'
+# The playstyle picked a move its character can't make. perform_attack does
+# nothing in that case, so in the UI the game would wait forever.
+STALLED = 'stalled'
+OUTCOMES = (P1_WIN, P2_WIN, TIE, STALLED)
+
+
+def automatic_playstyles() -> List[str]:
+    """
+    Return the keys of PLAYSTYLE_CLASSES whose playstyles pick moves without
+    a player, i.e. the ones that can be simulated.
+
+    >>> state = random.getstate()
+    >>> automatic_playstyles()
+    ['r', 'o']
+    >>> random.getstate() == state
+    True
+    """
+    return [key for key, playstyle in PLAYSTYLE_CLASSES.items()
+            if not playstyle.is_manual]
+
+
+def set_up_battle(p1_class: str = 'r', p2_class: str = 'm',
+                  p1_playstyle: str = 'r', p2_playstyle: str = 'r',
+                  p1_name: str = 'Player 1', p2_name: str = 'Player 2',
+                  queue_class: type = BattleQueue
+                  ) -> Tuple[BattleQueue, 'Character', 'Character']:
+    """
+    Return a new battle queue (a queue_class) and the two characters in it,
+    set up the same way as a1_game.set_up_game does but without prompting
+    for input.
+
+    >>> bq, p1, p2 = set_up_battle('r', 'm')
+    >>> bq.peek()
+    Player 1 (Rogue): 100/100
+    >>> p1.enemy is p2 and p2.enemy is p1
+    True
+    """
+    session = GameSession.new(p1_class, p2_class, p1_playstyle,
+                              p2_playstyle, p1_name, p2_name, queue_class)
+    return session.battle_queue, session.p1, session.p2
+
+
+def seed_playstyles(p1: 'Character', p2: 'Character', seed: object) -> None:
+    """
+    Seed the random number generators of p1's and p2's playstyles (those
+    that have one) from seed, so the battle between them is reproducible.
+
+    >>> bq, p1, p2 = set_up_battle('r', 'm')
+    >>> seed_playstyles(p1, p2, 1)
+    >>> first = play_battle(bq, p1)
+    >>> bq, p1, p2 = set_up_battle('r', 'm')
+    >>> seed_playstyles(p1, p2, 1)
+    >>> play_battle(bq, p1) == first
+    True
+    """
+    for player, character in enumerate((p1, p2), 1):
+        if hasattr(character.playstyle, 'seed'):
+            character.playstyle.seed('{}/{}'.format(seed, player))
+
+
+def play_battle(battle_queue: BattleQueue, p1: 'Character',
+                on_turn: Optional[Callable[['Character', str], None]] = None
+                ) -> Tuple[str, int]:
+    """
+    Play the battle in battle_queue to completion and return its outcome
+    (one of OUTCOMES, from p1's point of view) and the number of turns taken.
+
+    If on_turn is given, it's called with the character who moved and their
+    move after every turn.
+
+    Every character in battle_queue must use a non-manual playstyle.
+
+    >>> random.seed(3)
+    >>> bq, p1, p2 = set_up_battle('m', 'm')
+    >>> outcome, turns = play_battle(bq, p1)
+    >>> outcome in OUTCOMES and turns > 0
+    True
+    """
+    turns = 0
+    while not battle_queue.is_over():
+        character = battle_queue.peek()
+        move = character.playstyle.select_attack()
+        if not character.is_valid_action(move):
+            return STALLED, turns
+        if move == 'A':
+            character.attack()
+        else:
+            character.special_attack()
+        if character.get_available_actions() != []:
+            battle_queue.remove()
+        turns += 1
+        if on_turn is not None:
+            on_turn(character, move)
+
+    winner = battle_queue.get_winner()
+    if winner is None:
+        return TIE, turns
+    if winner is p1:
+        return P1_WIN, turns
+    return P2_WIN, turns
+
+
+def run_battles(battles: int, p1_class: str = 'r', p2_class: str = 'm',
+                p1_playstyle: str = 'r', p2_playstyle: str = 'r',
+                seed: Optional[int] = None) -> Dict[str, float]:
+    """
+    Simulate battles battles between the given classes and playstyles, and
+    return a summary containing the count of each outcome, the average
+    number of turns, a histogram of battle lengths (turn_histogram[t] is the
+    number of battles that took t turns) and the number of battles simulated
+    per second.
+
+    If seed is not None, the random module is seeded with it first so the
+    results are reproducible.
+
+    >>> summary = run_battles(50, 'r', 'r', seed=0)
+    >>> sum(summary[outcome] for outcome in OUTCOMES)
+    50
+    """
+    for playstyle in (p1_playstyle, p2_playstyle):
+        if playstyle not in automatic_playstyles():
+            raise ValueError("Manual playstyles can't be simulated.")
+    if seed is not None:
+        random.seed(seed)
+
+    counts = dict.fromkeys(OUTCOMES, 0)
+    histogram = Counter()
+    total_turns = 0
+    start = time.perf_counter()
+    for _ in range(battles):
+        battle_queue, p1, _ = set_up_battle(p1_class, p2_class,
+                                            p1_playstyle, p2_playstyle)
+        outcome, turns = play_battle(battle_queue, p1)
+        counts[outcome] += 1
+        histogram[turns] += 1
+        total_turns += turns
+    elapsed = time.perf_counter() - start
+
+    summary = dict(counts)
+    summary['battles'] = battles
+    summary['turn_histogram'] = histogram
+    summary['average_turns'] = total_turns / battles if battles else 0.0
+    summary['seconds'] = elapsed
+    summary['battles_per_second'] = battles / elapsed if elapsed else 0.0
+    return summary
+
+
+def main() -> None:
+    """
+    Run the simulator from the command line and print a summary.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('battles', type=int, nargs='?', default=10000)
+    parser.add_argument('--p1', default='r', choices=sorted(CHARACTER_CLASSES),
+                        help="class of the first character")
+    parser.add_argument('--p2', default='m', choices=sorted(CHARACTER_CLASSES),
+                        help="class of the second character")
+    parser.add_argument('--p1-playstyle', default='r',
+                        choices=sorted(PLAYSTYLE_CLASSES))
+    parser.add_argument('--p2-playstyle', default='r',
+                        choices=sorted(PLAYSTYLE_CLASSES))
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    summary = run_battles(args.battles, args.p1, args.p2, args.p1_playstyle,
+                          args.p2_playstyle, args.seed)
+    print("{} battles in {:.2f}s ({:,.0f} battles/s)".format(
+        summary['battles'], summary['seconds'],
+        summary['battles_per_second']))
+    print("P1 wins: {}, P2 wins: {}, ties: {}, stalled: {}".format(
+        summary[P1_WIN], summary[P2_WIN], summary[TIE], summary[STALLED]))
+    print("Average turns: {:.2f}".format(summary['average_turns']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+An exact solver for A1 battles.
+
+A battle is a finite two-player game: every move costs SP, so it always
+ends, and nothing is random once both players pick their moves. This module
+searches the whole game tree of a matchup with a transposition table, so
+each position is only solved once, and gives the perfect-play result and
+best move for any position.
+
+Positions are encoded as single ints (see Matchup.encode). The characters
+are always called p1 and p2 here; which one is which is up to the caller.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from a1_rules import RULES, SELF, STARTING_HP, STARTING_SP
+
+# Solved values are from p1's point of view: WIN - t means p1 wins in t more
+# turns, -(WIN - t) means p2 does, and 0 is a tie. The player to move picks
+# the fastest win, or the slowest loss.
+WIN = 1000
+# The bits each of HP and SP take up in an encoded position.
+FIELD_BITS = 8
+FIELD_MASK = (1 << FIELD_BITS) - 1
+
+
+class Matchup:
+    """
+    The rules of a battle between a p1_class and a p2_class character,
+    working on encoded positions.
+
+    A position is encoded as one int holding both characters' HP and SP and
+    the battle queue. The queue is a bit string with a 1 above its last
+    entry (so 0b110 is p1 then p2), where bit i is 1 if entry i is p2's.
+    Once either character has no actions left, the order of the queue no
+    longer matters (the other character makes every move), so it is stored
+    as empty; that way equivalent positions share one encoding.
+    """
+
+    def __init__(self, p1_class: type, p2_class: type) -> None:
+        """
+        Initialize the Matchup of p1_class against p2_class.
+        """
+        self.p1_class = p1_class
+        self.p2_class = p2_class
+        self.rules = (RULES[p1_class], RULES[p2_class])
+        self._min_costs = tuple(rules.min_cost() for rules in self.rules)
+
+    def encode(self, hp1: int, sp1: int, hp2: int, sp2: int,
+               queue: List[int]) -> int:
+        """
+        Return the encoded position where p1 has hp1 HP and sp1 SP, p2 has
+        hp2 HP and sp2 SP, and queue lists who each entry of the battle queue
+        belongs to, front first (0 for p1, 1 for p2).
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> m = Matchup(Rogue, Mage)
+        >>> m.decode(m.encode(100, 100, 93, 10, [1, 0, 0]))
+        (100, 100, 93, 10, [1, 0, 0])
+        """
+        for points in (hp1, sp1, hp2, sp2):
+            if not 0 <= points <= FIELD_MASK:
+                raise ValueError("HP and SP must be between 0 and {}.".format(
+                    FIELD_MASK))
+        code = 1
+        if sp1 >= self._min_costs[0] and sp2 >= self._min_costs[1]:
+            code <<= len(queue)
+            for i, who in enumerate(queue):
+                code |= who << i
+        return ((((code << FIELD_BITS | hp1) << FIELD_BITS | sp1)
+                 << FIELD_BITS | hp2) << FIELD_BITS | sp2)
+
+    @staticmethod
+    def decode(position: int) -> Tuple[int, int, int, int, List[int]]:
+        """
+        Return the (hp1, sp1, hp2, sp2, queue) that position encodes.
+        """
+        sp2 = position & FIELD_MASK
+        hp2 = position >> FIELD_BITS & FIELD_MASK
+        sp1 = position >> 2 * FIELD_BITS & FIELD_MASK
+        hp1 = position >> 3 * FIELD_BITS & FIELD_MASK
+        code = position >> 4 * FIELD_BITS
+        queue = [code >> i & 1 for i in range(code.bit_length() - 1)]
+        return hp1, sp1, hp2, sp2, queue
+
+    def start(self, first: int = 0) -> int:
+        """
+        Return the position at the start of a battle, where p1 moves first
+        if first is 0 and p2 does if it is 1.
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> m = Matchup(Rogue, Mage)
+        >>> m.mover(m.start(1))
+        1
+        """
+        return self.encode(STARTING_HP, STARTING_SP, STARTING_HP, STARTING_SP,
+                           [first, 1 - first])
+
+    def mover(self, position: int) -> Optional[int]:
+        """
+        Return who moves next in position (0 for p1, 1 for p2), or None if
+        the battle is over.
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> m = Matchup(Rogue, Mage)
+        >>> m.mover(m.start())
+        0
+        >>> m.mover(m.encode(100, 2, 100, 100, []))
+        1
+        """
+        if self.result(position) is not None:
+            return None
+        sp2 = position & FIELD_MASK
+        sp1 = position >> 2 * FIELD_BITS & FIELD_MASK
+        live1 = sp1 >= self._min_costs[0]
+        live2 = sp2 >= self._min_costs[1]
+        if live1 and live2:
+            return position >> 4 * FIELD_BITS & 1
+        return 0 if live1 else 1
+
+    def result(self, position: int) -> Optional[int]:
+        """
+        Return 1 if p1 has won in position, -1 if p2 has, 0 for a tie, or
+        None if the battle isn't over.
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> m = Matchup(Rogue, Mage)
+        >>> m.result(m.encode(0, 100, 5, 100, []))
+        -1
+        >>> m.result(m.encode(5, 2, 5, 4, [])) # neither can act
+        0
+        >>> m.result(m.start()) is None
+        True
+        """
+        sp2 = position & FIELD_MASK
+        hp2 = position >> FIELD_BITS & FIELD_MASK
+        sp1 = position >> 2 * FIELD_BITS & FIELD_MASK
+        hp1 = position >> 3 * FIELD_BITS & FIELD_MASK
+        if hp2 == 0:
+            return 1
+        if hp1 == 0:
+            return -1
+        if sp1 < self._min_costs[0] and sp2 < self._min_costs[1]:
+            return 0
+        return None
+
+    def moves(self, position: int) -> Tuple[str, ...]:
+        """
+        Return the moves available to whoever moves next in position.
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> m = Matchup(Rogue, Mage)
+        >>> m.moves(m.start())
+        ('S', 'A')
+        """
+        mover = self.mover(position)
+        if mover is None:
+            return ()
+        sp = position >> (2 - 2 * mover) * FIELD_BITS & FIELD_MASK
+        return self.rules[mover].available_actions(sp)
+
+    def play(self, position: int, move: str) -> int:
+        """
+        Return the position after whoever moves next in position makes move,
+        which must be one of moves(position).
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> m = Matchup(Rogue, Mage)
+        >>> m.decode(m.play(m.start(), 'S'))
+        (100, 90, 88, 100, [1, 0, 0])
+        """
+        hp1, sp1, hp2, sp2, queue = self.decode(position)
+        mover = self.mover(position)
+        rules = self.rules[mover]
+        enemy_defence = self.rules[1 - mover].defence
+        if mover == 0:
+            sp1 -= rules.cost(move)
+            hp2 = max(hp2 - (rules.damage(move) - enemy_defence), 0)
+            still_live = sp1 >= self._min_costs[0]
+        else:
+            sp2 -= rules.cost(move)
+            hp1 = max(hp1 - (rules.damage(move) - enemy_defence), 0)
+            still_live = sp2 >= self._min_costs[1]
+        queue = queue + [mover if who == SELF else 1 - mover
+                         for who in rules.adds(move)]
+        if still_live and queue:
+            queue.pop(0)
+        return self.encode(hp1, sp1, hp2, sp2, queue)
+
+
+class Solver:
+    """
+    Solves positions of one Matchup, remembering every position it has
+    solved in a transposition table.
+    """
+    matchup: Matchup
+    table: Dict[int, int]
+
+    def __init__(self, matchup: Matchup) -> None:
+        """
+        Initialize a Solver for matchup with an empty transposition table.
+        """
+        self.matchup = matchup
+        self.table = {}
+
+    def value(self, position: int) -> int:
+        """
+        Return the value of position under perfect play (see WIN).
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> s = Solver(Matchup(Rogue, Mage))
+        >>> s.value(s.matchup.encode(100, 100, 5, 100, [0, 1]))
+        999
+        """
+        value = self.table.get(position)
+        if value is not None:
+            return value
+
+        matchup = self.matchup
+        result = matchup.result(position)
+        if result is not None:
+            value = result * WIN
+        else:
+            values = [self.value(matchup.play(position, move))
+                      for move in matchup.moves(position)]
+            value = max(values) if matchup.mover(position) == 0 else \
+                min(values)
+            # One turn further from the end.
+            value -= (value > 0) - (value < 0)
+        self.table[position] = value
+        return value
+
+    def best_move(self, position: int) -> Optional[str]:
+        """
+        Return the best move for whoever moves next in position, or None if
+        the battle is over. Ties go to the move listed first by moves().
+
+        >>> from a1_character_class import Mage, Rogue
+        >>> s = Solver(Matchup(Rogue, Mage))
+        >>> s.best_move(s.matchup.encode(100, 100, 12, 100, [0, 1]))
+        'S'
+        """
+        matchup = self.matchup
+        moves = matchup.moves(position)
+        if not moves:
+            return None
+        sign = 1 if matchup.mover(position) == 0 else -1
+        return max(moves, key=lambda move: sign * self.value(
+            matchup.play(position, move)))
+
+    def solve(self, position: int) -> Tuple[int, Optional[str]]:
+        """
+        Return the perfect-play result of position (1 if p1 wins, -1 if p2
+        does, 0 for a tie) and the best move for whoever moves next.
+        """
+        value = self.value(position)
+        return (value > 0) - (value < 0), self.best_move(position)
+
+
+_SOLVERS = {}
+
+
+def solver_for(p1_class: type, p2_class: type) -> Solver:
+    """
+    Return the shared Solver for p1_class against p2_class, creating it the
+    first time it's asked for.
+    """
+    key = (p1_class, p2_class)
+    if key not in _SOLVERS:
+        _SOLVERS[key] = Solver(Matchup(p1_class, p2_class))
+    return _SOLVERS[key]
+
+
+def position_of(matchup: Matchup, p1: 'Character', battle_queue: 'BattleQueue'
+                ) -> int:
+    """
+    Return the encoded position of the battle in battle_queue, from the
+    point of view of matchup with p1 as its p1.
+    """
+    p2 = p1.enemy
+    queue = [0 if char is p1 else 1 for char in battle_queue.get_order()]
+    return matchup.encode(p1.get_hp(), p1.get_sp(), p2.get_hp(), p2.get_sp(),
+                          queue)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
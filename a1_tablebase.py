@@ -0,0 +1,235 @@
+"""
+A precomputed endgame tablebase for A1.
+
+build() solves every position reachable in each pairing of the classes in
+a1_rules.RULES (with either character moving first) with a1_solver and
+writes each position's value and best move to one binary file. Tablebase
+opens that file with mmap, so any number of processes can share a single
+page-cached copy. Nothing gets unpacked up front: a lookup hashes the
+position to a slot and reads that slot straight out of the mapping.
+
+File layout (all little-endian):
+    header     - magic b'A1TB', format version, number of sections (4sHH)
+    directory  - per section: p1 class name, p2 class name, offset of its
+                 slots from the start of the file, log2 of its slot count
+                 (16s16sQI)
+    sections   - open-addressed hash tables of (position, value, best move)
+                 slots (QhB), probed linearly from the position's hash. Empty
+                 slots have position 0, which never encodes a real position.
+
+Run it from the command line to build the tablebase, e.g.:
+    python a1_tablebase.py a1_tablebase.bin
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Optional, Tuple
+
+from a1_rules import RULES
+from a1_solver import Matchup, solver_for
+
+MAGIC = b'A1TB'
+VERSION = 2
+DEFAULT_PATH = 'a1_tablebase.bin'
+
+_HEADER = struct.Struct('<4sHH')
+_DIRECTORY_ENTRY = struct.Struct('<16s16sQI')
+_SLOT = struct.Struct('<QhB')
+_MOVES = ('', 'A', 'S')
+# Fibonacci hashing: multiply by 2**64 / golden ratio and keep the top bits.
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+def _slot_of(position: int, bits: int) -> int:
+    """
+    Return the slot position hashes to in a table of 2**bits slots.
+
+    >>> 0 <= _slot_of(123456789, 10) < 2 ** 10
+    True
+    """
+    return (position * _HASH_MULTIPLIER & _MASK_64) >> (64 - bits)
+
+
+def _section(p1_class: type, p2_class: type) -> Tuple[int, bytes]:
+    """
+    Solve the pairing of p1_class and p2_class and return the log2 of its
+    slot count and its packed slots.
+    """
+    solver = solver_for(p1_class, p2_class)
+    matchup = solver.matchup
+    # Players look positions up with themselves as p1, so the second player
+    # needs the positions reachable from p2 moving first.
+    solver.value(matchup.start(0))
+    solver.value(matchup.start(1))
+    positions = [position for position in solver.table
+                 if matchup.mover(position) is not None]
+
+    # Keep the table at most half full, so probes stay short.
+    bits = max(len(positions) * 2 - 1, 1).bit_length()
+    mask = (1 << bits) - 1
+    slots = bytearray(_SLOT.size << bits)
+    for position in positions:
+        slot = _slot_of(position, bits)
+        while _SLOT.unpack_from(slots, slot * _SLOT.size)[0]:
+            slot = (slot + 1) & mask
+        _SLOT.pack_into(slots, slot * _SLOT.size, position,
+                        solver.value(position),
+                        _MOVES.index(solver.best_move(position)))
+    return bits, bytes(slots)
+
+
+def build(path: str = DEFAULT_PATH) -> int:
+    """
+    Write the tablebase for every pairing of classes in RULES to path and
+    return its size in bytes.
+
+    The file is written next to path and then renamed over it, so processes
+    that already have the old one open keep a consistent copy.
+    """
+    pairings = [(p1_class, p2_class) for p1_class in RULES
+                for p2_class in RULES]
+    sections = [_section(p1_class, p2_class)
+                for p1_class, p2_class in pairings]
+
+    offset = _HEADER.size + _DIRECTORY_ENTRY.size * len(pairings)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(pairings)))
+        for (p1_class, p2_class), (bits, slots) in zip(pairings, sections):
+            file.write(_DIRECTORY_ENTRY.pack(p1_class.__name__.encode(),
+                                             p2_class.__name__.encode(),
+                                             offset, bits))
+            offset += len(slots)
+        for _, slots in sections:
+            file.write(slots)
+    os.replace(temporary, path)
+    return offset
+
+
+class Tablebase:
+    """
+    A read-only, memory-mapped tablebase written by build().
+    """
+    path: str
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        """
+        Open the tablebase at path.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("{} is not a version {} tablebase.".format(
+                path, VERSION))
+
+        classes = {character_class.__name__: character_class
+                   for character_class in RULES}
+        # (p1 class, p2 class) -> (Matchup, slot offset, log2 slot count)
+        self._sections: Dict[Tuple[type, type], Tuple[Matchup, int, int]] = {}
+        for i in range(count):
+            p1_name, p2_name, offset, bits = _DIRECTORY_ENTRY.unpack_from(
+                self._map, _HEADER.size + i * _DIRECTORY_ENTRY.size)
+            p1_class = classes[p1_name.rstrip(b'\0').decode()]
+            p2_class = classes[p2_name.rstrip(b'\0').decode()]
+            self._sections[(p1_class, p2_class)] = (
+                Matchup(p1_class, p2_class), offset, bits)
+
+    def matchup(self, p1_class: type, p2_class: type) -> Matchup:
+        """
+        Return the Matchup whose positions this tablebase's p1_class against
+        p2_class section is looked up by.
+        """
+        return self._sections[(p1_class, p2_class)][0]
+
+    def lookup(self, p1_class: type, p2_class: type, position: int
+               ) -> Optional[Tuple[int, str]]:
+        """
+        Return the a1_solver value and best move of position in the
+        p1_class against p2_class section, or None if it isn't in the
+        tablebase (e.g. the battle is over, or didn't start from full HP
+        and SP).
+        """
+        _, offset, bits = self._sections[(p1_class, p2_class)]
+        mask = (1 << bits) - 1
+        slot = _slot_of(position, bits)
+        while True:
+            key, value, move = _SLOT.unpack_from(
+                self._map, offset + slot * _SLOT.size)
+            if key == position:
+                return value, _MOVES[move]
+            if not key:
+                return None
+            slot = (slot + 1) & mask
+
+    def close(self) -> None:
+        """
+        Unmap this tablebase's file.
+        """
+        self._map.close()
+
+
+_TABLEBASES = {}
+
+
+def open_tablebase(path: str = DEFAULT_PATH) -> Tablebase:
+    """
+    Return the shared Tablebase for path, opening it the first time it's
+    asked for.
+    """
+    if path not in _TABLEBASES:
+        _TABLEBASES[path] = Tablebase(path)
+    return _TABLEBASES[path]
+
+
+def main() -> None:
+    """
+    Build the tablebase from the command line, check it against the solver
+    and print how fast lookups are.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    size = build(args.path)
+    print("Wrote {} ({:,} bytes) in {:.2f}s".format(
+        args.path, size, time.perf_counter() - start))
+
+    tablebase = Tablebase(args.path)
+    queries = []
+    for p1_class in RULES:
+        for p2_class in RULES:
+            matchup = tablebase.matchup(p1_class, p2_class)
+            for first in (0, 1):
+                if tablebase.lookup(p1_class, p2_class,
+                                    matchup.start(first)) is None:
+                    raise AssertionError("Tablebase is missing a start "
+                                         "position")
+            solver = solver_for(p1_class, p2_class)
+            for position, value in solver.table.items():
+                expected = None
+                if solver.matchup.mover(position) is not None:
+                    expected = (value, solver.best_move(position))
+                if tablebase.lookup(p1_class, p2_class,
+                                    position) != expected:
+                    raise AssertionError("Tablebase disagrees with the "
+                                         "solver at {}".format(position))
+                queries.append((p1_class, p2_class, position))
+
+    start = time.perf_counter()
+    for query in queries:
+        tablebase.lookup(*query)
+    elapsed = time.perf_counter() - start
+    print("Checked {:,} positions ({:.2f} us/lookup)".format(
+        len(queries), elapsed / len(queries) * 1e6))
+    tablebase.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+A multi-core tournament runner for A1.
+
+This plays every pairing of a1_game.CHARACTER_CLASSES and the automatic
+playstyles in a1_game.PLAYSTYLE_CLASSES against each other with the headless
+simulator in a1_simulate, spreading the battles over a process pool.
+
+Each pairing's battles are split into fixed-size shards, and every shard
+gets its own random seed derived from the tournament seed, the pairing and
+the shard number. Shards never depend on which worker runs them or in what
+order, so a tournament gives the same results whatever the worker count.
+
+Run it from the command line, e.g.:
+    python a1_tournament.py 100000 --workers 8 --seed 1
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from a1_game import CHARACTER_CLASSES
+from a1_simulate import (OUTCOMES, P1_WIN, P2_WIN, STALLED, TIE,
+                         automatic_playstyles, run_battles)
+
+# (p1 class, p2 class, p1 playstyle, p2 playstyle), as keys of a1_game's
+# CHARACTER_CLASSES and PLAYSTYLE_CLASSES.
+Pairing = Tuple[str, str, str, str]
+
+DEFAULT_SHARD_SIZE = 10000
+
+
+def pairings() -> List[Pairing]:
+    """
+    Return every pairing of classes and automatic playstyles.
+
+    >>> ('r', 'm', 'r', 'r') in pairings()
+    True
+    >>> len(pairings()) == (len(CHARACTER_CLASSES) *
+    ...                     len(automatic_playstyles())) ** 2
+    True
+    """
+    return [(p1_class, p2_class, p1_playstyle, p2_playstyle)
+            for p1_class in CHARACTER_CLASSES
+            for p2_class in CHARACTER_CLASSES
+            for p1_playstyle in automatic_playstyles()
+            for p2_playstyle in automatic_playstyles()]
+
+
+def shard_seed(seed: int, pairing: Pairing, shard: int) -> int:
+    """
+    Return the random seed of shard number shard of pairing in a tournament
+    seeded with seed.
+
+    >>> shard_seed(1, ('r', 'm', 'r', 'r'), 0) == shard_seed(
+    ...     1, ('r', 'm', 'r', 'r'), 0)
+    True
+    >>> shard_seed(1, ('r', 'm', 'r', 'r'), 0) == shard_seed(
+    ...     1, ('r', 'm', 'r', 'r'), 1)
+    False
+    """
+    return random.Random('{}/{}/{}'.format(seed, '-'.join(pairing),
+                                           shard)).getrandbits(64)
+
+
+def _run_shard(task: Tuple[Pairing, int, int]) -> Tuple[Pairing, dict]:
+    """
+    Play one shard of battles, given as (pairing, battles, seed), and return
+    the pairing with the shard's summary.
+    """
+    pairing, battles, seed = task
+    return pairing, run_battles(battles, *pairing, seed=seed)
+
+
+def _new_result() -> dict:
+    """
+    Return an empty result for one pairing.
+    """
+    result = dict.fromkeys(OUTCOMES, 0)
+    result['battles'] = 0
+    result['turn_histogram'] = Counter()
+    return result
+
+
+def run_tournament(battles: int, workers: Optional[int] = None,
+                   seed: int = 0, shard_size: int = DEFAULT_SHARD_SIZE
+                   ) -> Dict[Pairing, dict]:
+    """
+    Play battles battles of every pairing on workers processes (one per CPU
+    if workers is None) and return each pairing's merged outcome counts and
+    turn histogram.
+
+    >>> results = run_tournament(30, workers=2, shard_size=20)
+    >>> results == run_tournament(30, workers=1, shard_size=20)
+    True
+    >>> sum(results[('m', 'm', 'r', 'r')][outcome] for outcome in OUTCOMES)
+    30
+    """
+    tasks = []
+    for pairing in pairings():
+        for shard, first in enumerate(range(0, battles, shard_size)):
+            tasks.append((pairing, min(shard_size, battles - first),
+                          shard_seed(seed, pairing, shard)))
+
+    results = {pairing: _new_result() for pairing in pairings()}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for pairing, summary in executor.map(_run_shard, tasks):
+            result = results[pairing]
+            for outcome in OUTCOMES:
+                result[outcome] += summary[outcome]
+            result['battles'] += summary['battles']
+            result['turn_histogram'].update(summary['turn_histogram'])
+    return results
+
+
+def main() -> None:
+    """
+    Run a tournament from the command line and print each pairing's results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('battles', type=int, nargs='?', default=100000,
+                        help="battles per pairing")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_tournament(args.battles, args.workers, args.seed,
+                             args.shard_size)
+    elapsed = time.perf_counter() - start
+
+    print("{:<12} {:>9} {:>9} {:>9} {:>9} {:>8}".format(
+        "pairing", "p1 wins", "p2 wins", "ties", "stalled", "turns"))
+    for pairing, result in results.items():
+        histogram = result['turn_histogram']
+        average = (sum(t * n for t, n in histogram.items()) /
+                   result['battles'] if result['battles'] else 0.0)
+        print("{:<12} {:>9} {:>9} {:>9} {:>9} {:>8.2f}".format(
+            '-'.join(pairing), result[P1_WIN], result[P2_WIN], result[TIE],
+            result[STALLED], average))
+    total = sum(result['battles'] for result in results.values())
+    print("{} battles in {:.2f}s ({:,.0f} battles/s)".format(
+        total, elapsed, total / elapsed))
+
+
+if __name__ == '__main__':
+    main()
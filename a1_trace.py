@@ -0,0 +1,226 @@
+"""
+Lightweight timing instrumentation for A1.
+
+Code marks the phases it wants timed with spans:
+
+    with TRACE.span('update_game'):
+        update_game()
+
+While TRACE is disabled (the default), span() hands back a shared do-nothing
+context manager, so a span costs one method call. While it's enabled, each
+span records its name, start and end into a fixed-size ring buffer, which
+keeps the most recent events and never grows.
+
+The recorded events can be summarized as p50/p95/p99 times per span name, or
+written out as a Chrome trace-event file to open in chrome://tracing or
+Perfetto.
+
+Set the A1_TRACE environment variable (to anything but 0, false or no) to
+start with tracing enabled.
+"""
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# How many events a Recorder keeps by default.
+DEFAULT_CAPACITY = 65536
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return the value that fraction of the sorted list values are at or
+    below.
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 0.5)
+    2.0
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 0.99)
+    4.0
+    """
+    return values[max(int(len(values) * fraction + 0.5) - 1, 0)]
+
+
+class _NoSpan:
+    """
+    The span handed out while tracing is disabled. It does nothing.
+    """
+
+    def __enter__(self) -> None:
+        """
+        Do nothing.
+        """
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Do nothing.
+        """
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    """
+    Times a with block and records it in a Recorder.
+    """
+    __slots__ = ('_recorder', '_name', '_start')
+
+    def __init__(self, recorder: 'Recorder', name: str) -> None:
+        """
+        Initialize a span called name, to be recorded in recorder.
+        """
+        self._recorder = recorder
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        """
+        Start timing.
+        """
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Stop timing and record the span.
+        """
+        self._recorder.record(self._name, self._start, time.perf_counter())
+
+
+class Recorder:
+    """
+    Records timed events into a ring buffer of capacity events, overwriting
+    the oldest once it is full.
+
+    enabled - Whether spans are being recorded. It can be changed at any
+              time.
+    """
+    enabled: bool
+    capacity: int
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY,
+                 enabled: bool = False) -> None:
+        """
+        Initialize an empty Recorder.
+        """
+        self.enabled = enabled
+        self.capacity = capacity
+        self._names: List[Optional[str]] = [None] * capacity
+        self._starts = [0.0] * capacity
+        self._ends = [0.0] * capacity
+        self._next = 0
+        self._count = 0
+
+    def span(self, name: str) -> object:
+        """
+        Return a context manager that records the time its with block takes
+        as an event called name, if this Recorder is enabled.
+
+        >>> recorder = Recorder(4)
+        >>> with recorder.span('off'):
+        ...     pass
+        >>> recorder.enabled = True
+        >>> with recorder.span('on'):
+        ...     pass
+        >>> [name for name, _, _ in recorder.events()]
+        ['on']
+        """
+        if self.enabled:
+            return _Span(self, name)
+        return _NO_SPAN
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """
+        Record an event called name that ran from start to end (in
+        time.perf_counter seconds).
+        """
+        i = self._next
+        self._names[i] = name
+        self._starts[i] = start
+        self._ends[i] = end
+        self._next = i + 1 if i + 1 < self.capacity else 0
+        self._count += 1
+
+    def clear(self) -> None:
+        """
+        Forget every recorded event.
+        """
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of events this Recorder holds.
+        """
+        return min(self._count, self.capacity)
+
+    def events(self) -> Iterator[Tuple[str, float, float]]:
+        """
+        Yield the (name, start, end) of every event held, oldest first.
+
+        >>> recorder = Recorder(2)
+        >>> for i in range(3):
+        ...     recorder.record(str(i), i, i + 1)
+        >>> list(recorder.events())
+        [('1', 1, 2), ('2', 2, 3)]
+        """
+        first = self._next if self._count > self.capacity else 0
+        for j in range(len(self)):
+            i = (first + j) % self.capacity
+            yield self._names[i], self._starts[i], self._ends[i]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return the count and the p50, p95, p99 and maximum milliseconds of
+        the events held for each name.
+
+        >>> recorder = Recorder()
+        >>> for ms in range(1, 101):
+        ...     recorder.record('turn', 0, ms / 1000)
+        >>> summary = recorder.summary()['turn']
+        >>> summary['count'], round(summary['p95_ms'], 3)
+        (100, 95.0)
+        """
+        durations: Dict[str, List[float]] = {}
+        for name, start, end in self.events():
+            durations.setdefault(name, []).append((end - start) * 1000)
+        summary = {}
+        for name, values in durations.items():
+            values.sort()
+            summary[name] = {'count': len(values),
+                             'p50_ms': percentile(values, 0.50),
+                             'p95_ms': percentile(values, 0.95),
+                             'p99_ms': percentile(values, 0.99),
+                             'max_ms': values[-1]}
+        return summary
+
+    def format_summary(self) -> str:
+        """
+        Return summary() as a table.
+        """
+        lines = ["{:<20} {:>8} {:>9} {:>9} {:>9} {:>9}".format(
+            "span", "count", "p50 ms", "p95 ms", "p99 ms", "max ms")]
+        for name, stats in sorted(self.summary().items()):
+            lines.append("{:<20} {count:>8} {p50_ms:>9.3f} {p95_ms:>9.3f} "
+                         "{p99_ms:>9.3f} {max_ms:>9.3f}".format(name,
+                                                                 **stats))
+        return '\n'.join(lines)
+
+    def write_chrome_trace(self, path: str) -> None:
+        """
+        Write the events held to path in the Chrome trace-event format.
+        """
+        events = [{'name': name, 'ph': 'X', 'ts': start * 1e6,
+                   'dur': (end - start) * 1e6, 'pid': os.getpid(), 'tid': 0}
+                  for name, start, end in self.events()]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+
+# The Recorder the game's own code records into.
+TRACE = Recorder(enabled=os.environ.get('A1_TRACE', '').strip().lower()
+                 not in ('', '0', 'false', 'no'))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
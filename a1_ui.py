@@ -8,27 +8,62 @@ This file simply calls on pygame and the code from a1_game.py, which contains
 all of your client code.
 """
 import a1_game
+from a1_loop import FixedTimestep
+from a1_render import DirtyRectRenderer
+from a1_trace import TRACE
+from a1_ui_cache import BACKGROUND, SpriteCache, TextCache
 import pygame
 import sys
 
+# The game's logic runs in ticks of GAME_SPEED ms of game time
 GAME_SPEED = 100
-pygame.init()
+# The most frames drawn per second
+MAX_FPS = 60
+# Set to True to run the game's logic as fast as possible (T toggles it)
+TURBO = False
+# Where the timings recorded while tracing are written on exit
+TRACE_FILE = 'a1_trace.json'
 
 PYGAME_SCREEN = None
+SPRITES = None
+TEXT = None
+RENDERER = None
+# Set to False to redraw and flip the whole screen every frame
+DIRTY_RECTS = True
 CHARACTER_SIZE = 120
 NUMBER_OF_CHARACTERS = 2
 PADDING = 40
 P1_POSITION = CHARACTER_SIZE // 4
 P2_POSITION = CHARACTER_SIZE - (CHARACTER_SIZE // 4)
+# A random player makes a move every RANDOM_TIMER ticks
 RANDOM_TIMER = 10
 FONT_SIZE = 18
+# The latest value of every parameter from a1_game.update_ui_diff, and the
+# text layers of each label, which are only rebuilt when a parameter they
+# show changes
+DRAW_PARAMETERS = {}
+LABEL_LAYERS = {}
+LABEL_PARAMETERS = {'p1_label': ('p1_name', 'p1_hp', 'p1_sp'),
+                    'p2_label': ('p2_name', 'p2_hp', 'p2_sp'),
+                    'status': ('current_player', 'actions')}
+PARAMETER_LABELS = {parameter: name
+                    for name, parameters in LABEL_PARAMETERS.items()
+                    for parameter in parameters}
 
 def start_game():
     """
     Start and initialize the game
     """
-    global PYGAME_SCREEN, CHARACTER_SIZE, NUMBER_OF_CHARACTERS, FONT_SIZE
     a1_game.set_up_game()
+    create_window()
+
+def create_window():
+    """
+    Create the window for the game set up in a1_game, and everything needed
+    to draw on it
+    """
+    global PYGAME_SCREEN, CHARACTER_SIZE, NUMBER_OF_CHARACTERS, FONT_SIZE
+    global SPRITES, TEXT, RENDERER, LABEL_LAYERS
     
     # Set up the width and height of the screen (proportional to the character
     # sizes)
@@ -37,110 +72,168 @@ def start_game():
     
     pixel_size = width, height
     
+    # Start only the parts of pygame the UI uses (the display, which also
+    # delivers events, and fonts), now that they're needed
+    pygame.display.init()
+    pygame.font.init()
+    
     # set the screen to draw on
     PYGAME_SCREEN = pygame.display.set_mode(pixel_size)
 
+    # Load every sprite once, now that they can be converted to the
+    # display's format
+    SPRITES = SpriteCache()
+    SPRITES.preload()
+    TEXT = TextCache(FONT_SIZE)
+    RENDERER = DirtyRectRenderer(PYGAME_SCREEN, (255, 255, 255),
+                                 full_redraw=not DIRTY_RECTS)
+    LABEL_LAYERS = {}
+
+def text_layers(name, lines, x, y_coordinate):
+    """
+    Return the layers for lines of text, one under the other, starting at
+    (x, y_coordinate)
+    """
+    layers = []
+    for i, line in enumerate(lines):
+        layers.append(("{}_{}".format(name, i), line,
+                       TEXT.render(line, (0, 0, 0)), (x, y_coordinate)))
+        y_coordinate += FONT_SIZE
+    return layers
+
+def automatic_turn():
+    """
+    Return whether it's the turn of a player whose playstyle picks their
+    moves by itself (rather than waiting for a key press).
+    """
+    return (not a1_game.GAME_IS_OVER and
+            not a1_game.BATTLE_QUEUE.is_over() and
+            not a1_game.BATTLE_QUEUE.peek().playstyle.is_manual)
+
+def tick_game(tick):
+    """
+    Run tick number tick of the game's logic: a random player makes a move
+    every RANDOM_TIMER ticks, and every character moves on to the next frame
+    of their animation. Return what changed, for draw_game.
+    """
+    if automatic_turn() and (tick - 1) % RANDOM_TIMER == 0:
+        with TRACE.span('perform_attack'):
+            a1_game.perform_attack()
+    
+    with TRACE.span('update_ui'):
+        return a1_game.update_ui_diff(sprite_ids=True)
+
 def update_game():
     """
     Update the game's UI.
     """
-    global PYGAME_SCREEN, CHARACTER_SIZE, P1_POSITION, P2_POSITION
+    with TRACE.span('update_ui'):
+        changes = a1_game.update_ui_diff(sprite_ids=True)
+    draw_game(changes)
+
+def label_layers(name, draw_parameters):
+    """
+    Return the text layers of the label called name (one of
+    LABEL_PARAMETERS) for the game described by draw_parameters
+    """
+    if name != 'status':
+        player = name[:3]
+        label = "{}\nHP: {}\nSP: {}".format(
+            draw_parameters[player + 'name'], draw_parameters[player + 'hp'],
+            draw_parameters[player + 'sp']).split("\n")
+        position = P1_POSITION if player == 'p1_' else P2_POSITION
+        return text_layers(name, label, position + PADDING, 0)
     
-    draw_parameters = a1_game.update_ui()
+    # Show the current player and available actions
+    if not a1_game.GAME_IS_OVER:
+        actions = draw_parameters['actions']
+        current_player = draw_parameters['current_player']
+        label = ["Current Character: {}".format(current_player),
+                 "Available Actions: {}".format(", ".join(actions))]
+    else:
+        label = ["Game over!"]
+        winner = a1_game.GAME_WINNER
+        if winner:
+            label.append("The winner is {}!".format(winner.get_name()))
+        else:
+            label.append("The game ended in a tie!")
+    return text_layers('status', label, P1_POSITION + PADDING // 2,
+                       CHARACTER_SIZE + PADDING)
+
+def draw_game(changes):
+    """
+    Draw the game, given the parameters from a1_game.update_ui_diff (with
+    sprite IDs) that changed since the last frame drawn.
+    """
+    global PYGAME_SCREEN, CHARACTER_SIZE, P1_POSITION, P2_POSITION
     
-    p1_sprite = draw_parameters['p1_sprite']
-    p1_hp = draw_parameters['p1_hp']
-    p1_sp = draw_parameters['p1_sp']
-    p1_name = draw_parameters['p1_name']
+    DRAW_PARAMETERS.update(changes)
+    draw_parameters = DRAW_PARAMETERS
     
-    p1_label = "{}\nHP: {}\nSP: {}".format(p1_name, p1_hp, p1_sp).split("\n")
+    # Rebuild only the labels showing something that changed (the status
+    # changes along with the current player when the game ends)
+    if len(LABEL_LAYERS) < len(LABEL_PARAMETERS):
+        changed = LABEL_PARAMETERS
+    else:
+        changed = {PARAMETER_LABELS[parameter] for parameter in changes
+                   if parameter in PARAMETER_LABELS}
+    for name in changed:
+        LABEL_LAYERS[name] = label_layers(name, draw_parameters)
     
+    p1_sprite = draw_parameters['p1_sprite']
     p2_sprite = draw_parameters['p2_sprite']
-    p2_hp = draw_parameters['p2_hp']
-    p2_sp = draw_parameters['p2_sp']
-    p2_name = draw_parameters['p2_name']
     
-    p2_label = "{}\nHP: {}\nSP: {}".format(p2_name, p2_hp, p2_sp).split("\n")
-    
-    font_type = pygame.font.get_default_font()
-    font = pygame.font.SysFont(font_type, FONT_SIZE)
-    
-    p1_icon = pygame.image.load('sprites/' + p1_sprite + '.png')
-    p2_icon = pygame.image.load('sprites/' + p2_sprite + '.png')
-
-    PYGAME_SCREEN.fill((255, 255, 255)) # (255, 255, 255)=(r,g,b)=white
-    bg = pygame.image.load('sprites/background.png')
-    rect = pygame.Rect(0, 0, NUMBER_OF_CHARACTERS * CHARACTER_SIZE,
-                       CHARACTER_SIZE + PADDING * 2)
-    PYGAME_SCREEN.blit(bg, rect)
+    # The background covers the whole screen (which is cleared to white
+    # underneath it)
+    layers = [('background', BACKGROUND, SPRITES.get(BACKGROUND), (0, 0))]
     
     # Draw the first character
-    (x, y) = P1_POSITION, PADDING
-    rect = pygame.Rect(x, y, CHARACTER_SIZE, CHARACTER_SIZE)
-    PYGAME_SCREEN.blit(p1_icon, rect)
-    
-    y_coordinate = 0
-    for line in p1_label:
-        text = font.render(line, True, (0, 0, 0))
-        PYGAME_SCREEN.blit(text, (P1_POSITION + PADDING, y_coordinate))
-        y_coordinate += FONT_SIZE
+    layers.append(('p1_sprite', p1_sprite, SPRITES.get_by_id(p1_sprite),
+                   (P1_POSITION, PADDING)))
+    layers += LABEL_LAYERS['p1_label']
     
     # Draw the HP bar
     # Draw the SP bar
     
     # Draw the second character
     # Flip p2 so they face p1
-    p2_icon = pygame.transform.flip(p2_icon, True, False)
-    (x, y) = P2_POSITION, PADDING
-    rect = pygame.Rect(x, y, CHARACTER_SIZE, CHARACTER_SIZE)
-    PYGAME_SCREEN.blit(p2_icon, rect)
-
-    y_coordinate = 0
-    for line in p2_label:
-        text = font.render(line, True, (0, 0, 0))
-        PYGAME_SCREEN.blit(text, (P2_POSITION + PADDING, y_coordinate))
-        y_coordinate += FONT_SIZE    
+    layers.append(('p2_sprite', p2_sprite,
+                   SPRITES.get_by_id(p2_sprite, flipped=True),
+                   (P2_POSITION, PADDING)))
+    layers += LABEL_LAYERS['p2_label']
     
-    # Update the current player and available actions
-    if not a1_game.GAME_IS_OVER:
-        actions = draw_parameters['actions']
-        current_player = draw_parameters['current_player']
-        action_label = ["Current Character: {}".format(current_player),
-                        "Available Actions: {}".format(", ".join(actions))]
-    
-        y_coordinate = CHARACTER_SIZE + PADDING
-        for line in action_label:
-            text = font.render(line, True, (0, 0, 0))
-            PYGAME_SCREEN.blit(text, (P1_POSITION + PADDING // 2, y_coordinate))
-            y_coordinate += FONT_SIZE
-    else:
-        game_label = ["Game over!"]
-        winner = a1_game.GAME_WINNER
-        if winner:
-            game_label.append("The winner is {}!".format(winner.get_name()))
-        else:
-            game_label.append("The game ended in a tie!")
-        
-        y_coordinate = CHARACTER_SIZE + PADDING
-        for line in game_label:
-            text = font.render(line, True, (0, 0, 0))
-            PYGAME_SCREEN.blit(text, (P1_POSITION + PADDING // 2, y_coordinate))
-            y_coordinate += FONT_SIZE 
+    # Update the current player and available actions, or the winner
+    layers += LABEL_LAYERS['status']
     
-    pygame.display.flip()
+    # Redraw only what changed since the last frame
+    RENDERER.draw(layers)
 
 if __name__ == '__main__':
     start_game()
     update_game()
+    scheduler = FixedTimestep(GAME_SPEED / 1000, MAX_FPS)
+    scheduler.turbo = TURBO
+    changes = {}
     
     while True:
-        pygame.time.wait(GAME_SPEED)
-    
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                print("Sprite cache hit rate: {:.1%}, text cache hit rate: "
+                      "{:.1%}".format(SPRITES.hit_rate(), TEXT.hit_rate()))
+                if len(TRACE):
+                    print(TRACE.format_summary())
+                    TRACE.write_chrome_trace(TRACE_FILE)
+                    print("Wrote a Chrome trace to {}".format(TRACE_FILE))
                 pygame.quit()
                 sys.exit(0)
-            if event.type == pygame.KEYDOWN and not a1_game.GAME_IS_OVER:
+            # F3 turns timing on and off
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                TRACE.enabled = not TRACE.enabled
+                print("Tracing {}".format("on" if TRACE.enabled else "off"))
+            # T turns turbo mode on and off
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+                scheduler.turbo = not scheduler.turbo
+            elif event.type == pygame.KEYDOWN and not a1_game.GAME_IS_OVER:
                 # If the current player is using a manual playstyle, the
                 # pick a move when a key is pressed
                 if (not a1_game.BATTLE_QUEUE.is_over() and 
@@ -152,22 +245,33 @@ if __name__ == '__main__':
                         k = 'S'
                         
                     a1_game.LAST_KEY_PRESSED = k
-                    a1_game.perform_attack()
-                
-        # If the current player isn't using a manual playstyle, pick a move
-        if (not a1_game.GAME_IS_OVER and
-            not a1_game.BATTLE_QUEUE.is_over() and 
-            not a1_game.BATTLE_QUEUE.peek().playstyle.is_manual and
-            RANDOM_TIMER == 10):
-            a1_game.perform_attack()
-    
-        # Redraw the game
-        update_game()
+                    with TRACE.span('perform_attack'):
+                        a1_game.perform_attack()
+        
+        # Run the game logic for however many ticks are due (or as many as
+        # fit before the next frame, in turbo mode while nobody is waiting
+        # for a key press)
+        fast_forward = scheduler.turbo and automatic_turn()
+        if fast_forward:
+            while scheduler.turbo_tick_due():
+                changes.update(tick_game(scheduler.ticks))
+            if a1_game.GAME_IS_OVER:
+                scheduler.turbo = False
+        else:
+            for tick in scheduler.ticks_due():
+                changes.update(tick_game(tick))
+        
+        # Redraw the game if anything changed, as often as MAX_FPS allows
+        if changes and scheduler.frame_due():
+            with TRACE.span('draw_game'):
+                draw_game(changes)
+            scheduler.frame_drawn()
+            changes = {}
         
-        # Only let the random strategy make a decision every 10 ticks of time
-        RANDOM_TIMER -= 1
-        if RANDOM_TIMER == 0:
-            RANDOM_TIMER = 10
+        if not fast_forward:
+            with TRACE.span('wait'):
+                pygame.time.wait(max(
+                    int(scheduler.time_until_due() * 1000), 1))
     
     pygame.quit()
-    sys.exit(0)        
+    sys.exit(0)
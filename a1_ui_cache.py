@@ -0,0 +1,295 @@
+"""
+Caches for the A1 UI.
+
+SpriteCache keeps decoded sprite surfaces in memory, so that a1_ui can look
+sprites up by the IDs Character.get_next_sprite_id returns (or the names
+Character.get_next_sprite returns) instead of loading and decoding a PNG file
+from disk on every frame.
+
+TextCache keeps the UI's font and the surfaces of the text rendered with it,
+so a label that hasn't changed since the last frame costs no font work.
+"""
+import os
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import pygame
+
+from a1_animation import SPRITE_IDS, SPRITE_NAMES
+from a1_trace import TRACE
+
+SPRITE_DIRECTORY = 'sprites'
+BACKGROUND = 'background'
+# The sprites loaded up front: the background and every animation frame of
+# every character class.
+PRELOAD_PREFIXES = ('rogue_', 'mage_')
+# All the sprites that ship with the game take up under 2MB once decoded.
+DEFAULT_BUDGET = 16 * 1024 * 1024
+# The widest the sprite atlas can get before it starts a new row.
+ATLAS_WIDTH = 2048
+# The HUD shows about a dozen lines at once; this leaves room for every value
+# they show over a whole battle.
+DEFAULT_TEXT_ENTRIES = 512
+
+
+def _surface_bytes(surface: pygame.Surface) -> int:
+    """
+    Return how many bytes of pixel data surface holds.
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+def _hit_rate(hits: int, misses: int) -> float:
+    """
+    Return the fraction of lookups that were hits, or 0 if there were none.
+
+    >>> _hit_rate(3, 1)
+    0.75
+    >>> _hit_rate(0, 0)
+    0.0
+    """
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+
+class SpriteCache:
+    """
+    A cache of sprite surfaces, looked up by sprite name (e.g. 'rogue_idle_0'
+    for sprites/rogue_idle_0.png) or by sprite ID (see a1_animation).
+
+    Sprites are converted to the display's pixel format as they're loaded
+    (once the display has been set up), which makes blitting them cheaper.
+    The cache holds at most budget bytes of pixel data and evicts the least
+    recently used sprites when it goes over. An evicted sprite is simply
+    loaded from disk again the next time it's needed.
+
+    If atlas is True, preload() packs all the sprites it loads into a single
+    surface and hands out subsurfaces of it. Those sprites stay loaded for
+    the life of the cache and only sprites loaded later can be evicted.
+
+    hits - The number of lookups answered from memory.
+    misses - The number of lookups that had to load a sprite from disk.
+    """
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str = SPRITE_DIRECTORY,
+                 budget: int = DEFAULT_BUDGET, atlas: bool = False) -> None:
+        """
+        Initialize an empty SpriteCache for the sprites in directory.
+        """
+        self.directory = directory
+        self.budget = budget
+        self.use_atlas = atlas
+        self.atlas = None
+        self.hits = 0
+        self.misses = 0
+        # (name, flipped) -> surface, least recently used first.
+        self._surfaces = OrderedDict()
+        self._pinned = set()
+        self._memory_used = 0
+        # The surfaces of sprites looked up by ID, at index 2 * ID (+ 1 if
+        # flipped), or None for those not looked up since they were loaded.
+        self._by_id = [None] * (2 * len(SPRITE_NAMES))
+
+    def memory_used(self) -> int:
+        """
+        Return the bytes of pixel data this cache is holding.
+        """
+        return self._memory_used
+
+    def hit_rate(self) -> float:
+        """
+        Return the fraction of lookups answered from memory.
+        """
+        return _hit_rate(self.hits, self.misses)
+
+    def preload(self) -> None:
+        """
+        Load the background and every character sprite in this cache's
+        directory.
+        """
+        names = sorted(
+            filename[:-len('.png')]
+            for filename in os.listdir(self.directory)
+            if filename.endswith('.png') and
+            (filename.startswith(PRELOAD_PREFIXES) or
+             filename == BACKGROUND + '.png'))
+        if self.use_atlas:
+            self._build_atlas(names)
+        else:
+            for name in names:
+                self.get(name)
+
+    def get(self, name: str, flipped: bool = False) -> pygame.Surface:
+        """
+        Return the surface for the sprite named name, mirrored horizontally
+        if flipped is True.
+        """
+        key = (name, flipped)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        if flipped:
+            surface = pygame.transform.flip(self.get(name), True, False)
+        else:
+            surface = self._load(name)
+        self._surfaces[key] = surface
+        self._memory_used += _surface_bytes(surface)
+        self._evict()
+        return surface
+
+    def get_by_id(self, sprite: int, flipped: bool = False
+                  ) -> pygame.Surface:
+        """
+        Return the surface for the sprite with ID sprite, mirrored
+        horizontally if flipped is True. Once a sprite has been looked up
+        this way, this skips building its name to find it.
+
+        >>> import tempfile
+        >>> directory = tempfile.mkdtemp()
+        >>> for name in SPRITE_NAMES[:3]:
+        ...     pygame.image.save(pygame.Surface((10, 10)),
+        ...                       os.path.join(directory, name + '.png'))
+        >>> cache = SpriteCache(directory, budget=2 * 10 * 10 * 4)
+        >>> first = cache.get_by_id(0)
+        >>> _ = cache.get_by_id(1)
+        >>> cache.get_by_id(0) is first
+        True
+        >>> _ = cache.get_by_id(2)
+        >>> cache.get_by_id(0) is first
+        True
+        >>> cache.misses
+        3
+        """
+        index = 2 * sprite + flipped
+        surface = self._by_id[index]
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end((SPRITE_NAMES[sprite], flipped))
+            return surface
+        surface = self._by_id[index] = self.get(SPRITE_NAMES[sprite], flipped)
+        return surface
+
+    def _load(self, name: str) -> pygame.Surface:
+        """
+        Load the sprite named name from disk, in the display's pixel format
+        if there is a display.
+        """
+        with TRACE.span('load_image'):
+            surface = pygame.image.load(os.path.join(self.directory,
+                                                     name + '.png'))
+        if pygame.display.get_surface() is None:
+            return surface
+        if surface.get_flags() & pygame.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def _evict(self) -> None:
+        """
+        Evict least recently used sprites until this cache is within its
+        budget. The sprite used last and the atlas are never evicted.
+        """
+        evictable = [key for key in self._surfaces
+                     if key not in self._pinned][:-1]
+        for key in evictable:
+            if self._memory_used <= self.budget:
+                return
+            self._memory_used -= _surface_bytes(self._surfaces.pop(key))
+            name, flipped = key
+            if name in SPRITE_IDS:
+                self._by_id[2 * SPRITE_IDS[name] + flipped] = None
+
+    def _build_atlas(self, names: List[str]) -> None:
+        """
+        Load the sprites named in names and pack them into one atlas surface,
+        row by row, tallest first.
+        """
+        loaded = sorted(((name, self._load(name)) for name in names),
+                        key=lambda item: -item[1].get_height())
+        positions: Dict[str, Tuple[int, int]] = {}
+        x = y = row_height = width = 0
+        for name, surface in loaded:
+            w, h = surface.get_size()
+            if x and x + w > ATLAS_WIDTH:
+                x, y, row_height = 0, y + row_height, 0
+            positions[name] = (x, y)
+            x += w
+            width = max(width, x)
+            row_height = max(row_height, h)
+
+        self.atlas = pygame.Surface((width, y + row_height), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            self.atlas = self.atlas.convert_alpha()
+        self._memory_used += _surface_bytes(self.atlas)
+        for name, surface in loaded:
+            self.atlas.blit(surface, positions[name])
+            key = (name, False)
+            self._surfaces[key] = self.atlas.subsurface(
+                pygame.Rect(positions[name], surface.get_size()))
+            self._pinned.add(key)
+
+
+class TextCache:
+    """
+    A cache of rendered text surfaces for one font size.
+
+    The font is looked up once, and rendered surfaces are kept by
+    (text, color), evicting the least recently used once there are more than
+    max_entries of them.
+
+    hits - The number of lookups answered from memory.
+    misses - The number of lookups that had to render the text.
+    """
+    hits: int
+    misses: int
+
+    def __init__(self, font_size: int,
+                 max_entries: int = DEFAULT_TEXT_ENTRIES) -> None:
+        """
+        Initialize an empty TextCache for the default font at font_size.
+        """
+        self.font_size = font_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._font = None
+        self._surfaces = OrderedDict()
+
+    def font(self) -> pygame.font.Font:
+        """
+        Return this cache's font, looking it up the first time.
+        """
+        if self._font is None:
+            self._font = pygame.font.SysFont(pygame.font.get_default_font(),
+                                             self.font_size)
+        return self._font
+
+    def render(self, text: str, color: Tuple[int, int, int]
+               ) -> pygame.Surface:
+        """
+        Return a surface with text rendered (antialiased) in color.
+        """
+        key = (text, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.font().render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def hit_rate(self) -> float:
+        """
+        Return the fraction of lookups answered from memory.
+        """
+        return _hit_rate(self.hits, self.misses)
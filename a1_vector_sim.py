@@ -0,0 +1,268 @@
+"""
+A vectorized battle simulator for A1, built on NumPy.
+
+Instead of stepping one battle at a time through Character and BattleQueue
+objects, this holds the HP, SP and battle queue of N independent battles in
+NumPy arrays and plays one turn of every unfinished battle per step. Finished
+battles are retired as soon as they end and compacted out of the arrays once
+enough of them pile up.
+
+Two observations keep the state small:
+    - A character with no available actions never gets any back, and the
+      BattleQueue skips its entries. So once either character is out of
+      actions, the other one makes every remaining move and the order of the
+      queue no longer matters.
+    - While both characters can act, the queue only grows when a special
+      attack adds two entries, so it never holds more than
+      2 + (special attacks the two characters can afford) entries. For Rogue
+      and Mage that is at most 22, so the queue fits in the bits of one
+      unsigned integer (bit i is 1 if the i-th entry is player 2).
+
+The random playstyle follows a1_rules.random_playstyle_moves, so battles
+between two RandomPlaystyles have the same outcome distribution as
+a1_simulate.run_battles.
+"""
+import argparse
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from a1_game import CHARACTER_CLASSES
+from a1_rules import (RULES, SELF, STARTING_HP, STARTING_SP,
+                      random_playstyle_moves)
+from a1_simulate import OUTCOMES, P1_WIN, P2_WIN, STALLED, TIE
+
+
+def _max_queue_length(p1_rules: 'ClassRules', p2_rules: 'ClassRules') -> int:
+    """
+    Return the most entries the battle queue can hold while both characters
+    still have available actions.
+    """
+    return 2 + sum(STARTING_SP // rules.special_cost *
+                   (len(rules.special_adds) - 1)
+                   for rules in (p1_rules, p2_rules))
+
+
+def _random_thresholds(character_class: type) -> Tuple[int, int]:
+    """
+    Return the least SP at which a random playstyle starts picking a special
+    attack and a normal attack for a character_class character.
+    """
+    firsts = []
+    for move in 'SA':
+        picked = [move in random_playstyle_moves(character_class, sp)
+                  for sp in range(STARTING_SP + 1)]
+        first = picked.index(True) if True in picked else STARTING_SP + 1
+        if picked != [sp >= first for sp in range(STARTING_SP + 1)]:
+            raise ValueError("Random moves must be picked from an SP "
+                             "threshold upwards.")
+        firsts.append(first)
+    return firsts[0], firsts[1]
+
+
+class _Player:
+    """
+    The per-class constants of one side of the simulated battles.
+    """
+
+    def __init__(self, character_class: type, enemy_class: type,
+                 is_p2: bool) -> None:
+        """
+        Initialize the constants for a character_class player fighting an
+        enemy_class player.
+        """
+        rules, enemy_rules = RULES[character_class], RULES[enemy_class]
+        me, enemy = int(is_p2), int(not is_p2)
+        self.min_cost = rules.min_cost()
+        self.special_from, self.attack_from = _random_thresholds(
+            character_class)
+        self.attack_cost = rules.attack_cost
+        self.special_cost = rules.special_cost
+        self.attack_damage = rules.attack_damage - enemy_rules.defence
+        self.special_damage = rules.special_damage - enemy_rules.defence
+        self.attack_adds = len(rules.attack_adds)
+        self.special_adds = len(rules.special_adds)
+        # The queue entries each move adds as bits, the first one lowest.
+        self.attack_bits, self.special_bits = (
+            sum((me if who == SELF else enemy) << i
+                for i, who in enumerate(adds))
+            for adds in (rules.attack_adds, rules.special_adds))
+
+
+def _pick(p2_moves: np.ndarray, p1_value: int, p2_value: int) -> Any:
+    """
+    Return p2_value where p2_moves is 1 and p1_value where it is 0.
+    """
+    if p1_value == p2_value:
+        return p1_value
+    return p1_value + p2_moves * (p2_value - p1_value)
+
+
+def simulate(battles: int, p1_class: str = 'r', p2_class: str = 'm',
+             seed: Optional[int] = None) -> Dict[str, object]:
+    """
+    Simulate battles battles between a p1_class and a p2_class character
+    (keys of a1_game.CHARACTER_CLASSES), both using a random playstyle.
+
+    Return the count of each outcome in OUTCOMES, the average number of
+    turns, a histogram of battle lengths (turn_histogram[t] is the number of
+    battles that took t turns) and the number of battles simulated per second.
+
+    >>> summary = simulate(1000, 'r', 'm', seed=0)
+    >>> sum(summary[outcome] for outcome in OUTCOMES)
+    1000
+    >>> int(summary['turn_histogram'].sum())
+    1000
+    """
+    p1_type, p2_type = CHARACTER_CLASSES[p1_class], CHARACTER_CLASSES[p2_class]
+    max_length = _max_queue_length(RULES[p1_type], RULES[p2_type])
+    if max_length > 64:
+        raise ValueError("The battle queue doesn't fit in 64 bits.")
+    queue_type = np.uint32 if max_length <= 32 else np.uint64
+    p1 = _Player(p1_type, p2_type, False)
+    p2 = _Player(p2_type, p1_type, True)
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+
+    hp1 = np.full(battles, STARTING_HP, dtype=np.int16)
+    hp2 = hp1.copy()
+    sp1 = np.full(battles, STARTING_SP, dtype=np.int16)
+    sp2 = sp1.copy()
+    # P1 then P2, as added by set_up_game.
+    queue = np.full(battles, 0b10, dtype=queue_type)
+    queue_length = np.full(battles, 2, dtype=queue_type)
+    turns = np.zeros(battles, dtype=np.int16)
+    # Finished battles stay in the arrays, unchanged, until enough of them
+    # pile up to be worth compacting away.
+    finished = np.zeros(battles, dtype=bool)
+    unfinished = battles
+
+    counts = dict.fromkeys(OUTCOMES, 0)
+    histogram = np.zeros(1, dtype=np.int64)
+
+    def retire(ended: np.ndarray, outcome: str) -> None:
+        """
+        Record that the battles marked in ended finished with outcome.
+        """
+        nonlocal histogram, unfinished
+        ended_count = int(np.count_nonzero(ended))
+        if not ended_count:
+            return
+        counts[outcome] += ended_count
+        unfinished -= ended_count
+        lengths = np.bincount(turns[ended])
+        if len(lengths) > len(histogram):
+            lengths[:len(histogram)] += histogram
+            histogram = lengths
+        else:
+            histogram[:len(lengths)] += lengths
+        finished[ended] = True
+
+    while unfinished:
+        if unfinished * 4 < len(finished):
+            keep = ~finished
+            hp1, hp2, sp1, sp2 = hp1[keep], hp2[keep], sp1[keep], sp2[keep]
+            queue, queue_length = queue[keep], queue_length[keep]
+            turns, finished = turns[keep], finished[keep]
+
+        live1 = sp1 >= p1.min_cost
+        live2 = sp2 >= p2.min_cost
+        p1_dead = hp1 == 0
+        p2_dead = hp2 == 0
+        ended = ~finished & (p1_dead | p2_dead | ~(live1 | live2))
+        retire(ended & p2_dead, P1_WIN)
+        retire(ended & p1_dead, P2_WIN)
+        retire(ended & ~(p1_dead | p2_dead), TIE)
+        if not unfinished:
+            break
+
+        # Who moves: the front of the queue while both can act, otherwise
+        # whoever still can.
+        both = live1 & live2
+        p2_moves = (both & (queue & 1).astype(bool)) | (~both & live2)
+        p2_int = p2_moves.astype(np.int16)
+
+        # Pick a move at random from the random playstyle's choices.
+        actor_sp = sp1 + p2_int * (sp2 - sp1)
+        has_special = actor_sp >= _pick(p2_int, p1.special_from,
+                                        p2.special_from)
+        has_attack = actor_sp >= _pick(p2_int, p1.attack_from,
+                                       p2.attack_from)
+        coin = np.unpackbits(np.frombuffer(
+            rng.bytes((len(actor_sp) + 7) // 8), dtype=np.uint8),
+            count=len(actor_sp)).view(bool)
+        special = has_special & (coin | ~has_attack)
+        special_int = special.astype(np.int16)
+        attack_cost = _pick(p2_int, p1.attack_cost, p2.attack_cost)
+        cost = attack_cost + special_int * (
+            _pick(p2_int, p1.special_cost, p2.special_cost) - attack_cost)
+        stalled = ~finished & (~(has_special | has_attack) |
+                               (actor_sp < cost))
+        retire(stalled, STALLED)
+
+        # Pay for and perform the move in every unfinished battle.
+        running = (~finished).astype(np.int16)
+        cost = cost * running
+        attack_damage = _pick(p2_int, p1.attack_damage, p2.attack_damage)
+        damage = running * (attack_damage + special_int * (
+            _pick(p2_int, p1.special_damage, p2.special_damage) -
+            attack_damage))
+        sp1 = sp1 - (1 - p2_int) * cost
+        sp2 = sp2 - p2_int * cost
+        hp1 = np.maximum(hp1 - p2_int * damage, 0)
+        hp2 = np.maximum(hp2 - (1 - p2_int) * damage, 0)
+        turns += running
+
+        # Update the queue of battles where both characters could act: add
+        # the move's entries to the back, then remove the front entry if the
+        # character that moved can still act.
+        both = (both & ~finished).astype(queue_type)
+        adds = _pick(p2_int, p1.attack_adds, p2.attack_adds)
+        adds = adds + special_int * (
+            _pick(p2_int, p1.special_adds, p2.special_adds) - adds)
+        bits = _pick(p2_int, p1.attack_bits, p2.attack_bits)
+        bits = bits + special_int * (
+            _pick(p2_int, p1.special_bits, p2.special_bits) - bits)
+        queue |= (both * bits.astype(queue_type)) << queue_length
+        queue_length += both * adds.astype(queue_type)
+        still_live = np.where(p2_moves, sp2 >= p2.min_cost,
+                              sp1 >= p1.min_cost)
+        pop = both * still_live.astype(queue_type)
+        queue >>= pop
+        queue_length -= pop
+
+    elapsed = time.perf_counter() - start
+    summary = dict(counts)
+    summary['battles'] = battles
+    summary['turn_histogram'] = histogram
+    summary['average_turns'] = (float(np.dot(np.arange(len(histogram)),
+                                             histogram)) / battles
+                                if battles else 0.0)
+    summary['seconds'] = elapsed
+    summary['battles_per_second'] = battles / elapsed if elapsed else 0.0
+    return summary
+
+
+def main() -> None:
+    """
+    Run the vectorized simulator from the command line and print a summary.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('battles', type=int, nargs='?', default=1000000)
+    parser.add_argument('--p1', default='r', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--p2', default='m', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    summary = simulate(args.battles, args.p1, args.p2, args.seed)
+    print("{} battles in {:.2f}s ({:,.0f} battles/s)".format(
+        summary['battles'], summary['seconds'],
+        summary['battles_per_second']))
+    print("P1 wins: {}, P2 wins: {}, ties: {}, stalled: {}".format(
+        summary[P1_WIN], summary[P2_WIN], summary[TIE], summary[STALLED]))
+    print("Average turns: {:.2f}".format(summary['average_turns']))
+
+
+if __name__ == '__main__':
+    main()